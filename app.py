@@ -21,13 +21,12 @@
 # SOFTWARE.
 
 import streamlit as st
-from PIL import Image
-import os, time
 
-# --- Google GenAI imports ---------------------------
-from google import genai
-from google.genai import types
-# ----------------------------------------------------
+from llm import resources
+from llm.gateway import get_gateway
+from ui import assets, memory, persistence
+from ui.admin import render_admin_panel
+from ui.common import chat_transcript, session_id
 
 # Streamlit page setup
 st.set_page_config(
@@ -36,29 +35,10 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded",
 )
-#tabs 
-st.markdown("""
-<style>
-.stTabs [data-baseweb="tab"] { font-size: 3rem; padding: .6rem 1rem; }
-.stTabs [data-baseweb="tab"][aria-selected="true"] { border-bottom: 3px solid var(--primary-color); font-weight: 600; }
-</style>
-""", unsafe_allow_html=True)
-
-
-# ---- Simple header (like the inspiration) ----
-st.image("assets/banner.png", use_container_width=True)
-
-# Optional CSS — remove bubble/bg only for assistant messages using Avatar.png
-st.markdown(
-    "<style>"
-    "[data-testid='stChatMessage']:has(img[src*=\"Avatar.png\"]) "
-    "{background:transparent!important;box-shadow:none!important;}"
-    "[data-testid='stChatMessage']:has(img[src*=\"Avatar.png\"]) "
-    "[data-testid='stChatMessageAvatar']"
-    "{background:transparent!important;border:none!important;box-shadow:none!important;}"
-    "</style>",
-    unsafe_allow_html=True
-)
+memory.touch(session_id())  # brings back chat/transcript if this session was idle-spilled
+# Styles (assets/app.css) and the pre-resized header image (ui/assets.py)
+assets.inject_css()
+assets.banner()
 
 # --- Sidebar ----------------------------------------
 with st.sidebar:
@@ -71,75 +51,39 @@ with st.sidebar:
     )
     if st.button("🗑️ Clear Chat History", use_container_width=True):
         st.session_state.pop("chat", None)
-        st.session_state.pop("chat_history", None)
+        chat_transcript().clear()
+        persistence.record_clear()
         st.rerun()
-
-# --- Helpers ----------------------------------------
-def load_system_prompt() -> str:
-    try:
-        with open("rules.txt") as f:
-            return f.read()
-    except FileNotFoundError:
-        return "You are InspiraBot. Follow the rules provided by the instructor. Be helpful, friendly, and concise."
+    render_admin_panel()
 
 # --- Gemini configuration ---------------------------
+# Client, rules.txt and the assembled system instruction are shared per process
+# (llm/resources.py); every model call goes through the gateway (llm/gateway.py).
 try:
-    client = genai.Client(api_key=st.secrets["GEMINI_API_KEY"])
-    system_instructions = load_system_prompt()
-    search_tool = types.Tool(google_search=types.GoogleSearch())
-
-    generation_cfg = types.GenerateContentConfig(
-        system_instruction=system_instructions,
-        tools=[search_tool],
-        temperature=1.0,
-        top_p=1,
-        top_k=1,
-        max_output_tokens=2048,
-    )
+    st.session_state["rules_text"] = resources.load_rules()
+    gateway = get_gateway()
+    persistence.resume()  # saved session for ?s=<token>, if any (no model call)
 
     if "chat" not in st.session_state:
-        st.session_state.chat = client.chats.create(
-            model="gemini-2.5-flash",
-            config=generation_cfg,
-        )
+        prompt = resources.system_prompt()
+        st.session_state["system_prompt"] = prompt
+        st.session_state.chat = gateway.start_chat(prompt)
 except Exception as e:
     st.error(f"Gemini initialization error: {e}")
 
 # Ensure chat history store exists
-st.session_state.setdefault("chat_history", [])
+chat_transcript()
+session_id()
 
-# Resolve assistant avatar path (supports /assets or root)
-if "assistant_avatar" not in st.session_state:
-    st.session_state["assistant_avatar"] = (
-        os.path.join("assets", "Avatar.png")
-        if os.path.exists(os.path.join("assets", "Avatar.png"))
-        else "Avatar.png"
-    )
+# Small pre-resized assistant avatar
+st.session_state.setdefault("assistant_avatar", assets.avatar_path())
 
 # --- Tabs glue ---------------------------------------------------------------
+# Only the selected tab runs on each rerun; its module is imported on first open.
+from ui.router import render_tabs
 
-import ui.intro as intro
-import ui.key_pieces as key_pieces
-import ui.outline as outline
-import ui.synopsis as synopsis
-import ui.brainstorm as brainstorm
-import ui.drafting as drafting
-
-TAB_LABELS = ["👋 Intro", "🌱 Key Pieces", "💭 Outline", "📝 Synopsis", "🧠 Brainstorm", "✏️ Drafting"]
-tabs = st.tabs(TAB_LABELS)
-
-with tabs[0]:
-    intro.render()
-with tabs[1]:
-    key_pieces.render()
-with tabs[2]:
-    outline.render()      # includes chat session (guided outline)
-with tabs[3]:
-    synopsis.render()     # includes chat session (synopsis + save/validate)
-with tabs[4]:
-    brainstorm.render()   # skeleton only in Phase 1a
-with tabs[5]:
-    drafting.render()     # skeleton only in Phase 1a
+render_tabs()
+persistence.save_state()  # queued; written by the session store's background writer
 
 # Footer
 st.markdown(
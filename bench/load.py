@@ -0,0 +1,177 @@
+# === BEGIN FILE: bench/load.py ===
+"""Multi-session load generator and capacity report (offline fake model).
+
+Runs N simulated students concurrently in one process, each doing the full
+Key Pieces submit -> Outline chat -> Complete journey (see bench.reruns.Session),
+and reports throughput, rerun latency percentiles, thread count and RSS per session.
+
+    python -m bench.load --sessions 30 --concurrency 30
+    FAKE_TTFT_MS=800 FAKE_TOKENS_PER_S=60 python -m bench.load --sessions 60
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from bench import reruns
+
+# Realistic model timing by default (override with the FAKE_* environment variables)
+LOAD_ENV = {"FAKE_TTFT_MS": "600", "FAKE_TOKENS_PER_S": "120", "FAKE_REPLY_TOKENS": "80"}
+
+
+def rss_kb() -> int:
+    """Resident set size of this process (Linux /proc, else ru_maxrss as an upper bound)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Sampler(threading.Thread):
+    """Background sampler for peak thread count and RSS during the run."""
+
+    def __init__(self, every_s: float = 0.2):
+        super().__init__(daemon=True)
+        self.every_s = every_s
+        self.peak_threads = threading.active_count()
+        self.peak_rss_kb = rss_kb()
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.every_s):
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_rss_kb = max(self.peak_rss_kb, rss_kb())
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+def _allow_concurrent_apptests() -> None:
+    """Let several AppTests run at once in this process, the way one server runs many sessions.
+
+    AppTest assumes one app run at a time:
+    - it installs a mock Runtime singleton per run and resets it to None afterwards,
+      so a concurrent session can see None mid-run: keep handing out the latest mock;
+    - it compiles the script with a fresh ScriptCache per run, and concurrent ast.parse
+      calls are not safe on every CPython: compile once and share it (a real server's
+      Runtime also shares one ScriptCache across sessions).
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    last = {}
+
+    def instance(cls):
+        inst = cls._instance
+        if inst is not None:
+            last["runtime"] = inst
+            return inst
+        if "runtime" in last:
+            return last["runtime"]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or "runtime" in last)
+
+    compile_once = ScriptCache.get_bytecode
+    compiled, lock = {}, threading.Lock()
+
+    def get_bytecode(self, script_path):
+        with lock:
+            if script_path not in compiled:
+                compiled[script_path] = compile_once(self, script_path)
+            return compiled[script_path]
+
+    ScriptCache.get_bytecode = get_bytecode
+
+
+def _student(i: int, turns: int) -> tuple:
+    s = reruns.Session(timeout=300)
+    t0 = time.perf_counter()
+    try:
+        s.walk(turns)
+        error = ""
+    except Exception as e:  # keep going; report failures
+        error = f"{type(e).__name__}: {e}"
+    return s, time.perf_counter() - t0, error
+
+
+def run(sessions: int, concurrency: int, turns: int) -> dict:
+    for k, v in LOAD_ENV.items():
+        os.environ.setdefault(k, v)
+    reruns._env()
+    _allow_concurrent_apptests()
+    from llm import telemetry
+
+    reruns.Session().walk(1)  # warm imports and shared caches outside the measurement
+    base_rss, base_threads = rss_kb(), threading.active_count()
+    sampler = Sampler()
+    sampler.start()
+    t0 = time.perf_counter()
+    done, walls, errors = [], [], []
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="student") as pool:
+        futures = [pool.submit(_student, i, turns) for i in range(sessions)]
+        for fut in as_completed(futures):
+            s, wall, error = fut.result()
+            done.append(s)  # keep sessions alive: RSS growth is per *connected* student
+            walls.append(wall)
+            if error:
+                errors.append(error)
+    elapsed = time.perf_counter() - t0
+    sampler.stop()
+    end_rss = rss_kb()
+
+    ms = [t * 1000 for s in done for _, t in s.timings]
+    chat_ms = [t * 1000 for s in done for step, t in s.timings if step.startswith("chat")]
+    complete_ms = [t * 1000 for s in done for step, t in s.timings if step.startswith("complete")]
+    pct = reruns._pct
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "turns_per_stage": turns,
+        "errors": len(errors),
+        "first_errors": errors[:3],
+        "elapsed_s": round(elapsed, 2),
+        "sessions_per_min": round(60 * len(done) / elapsed, 2),
+        "reruns_per_s": round(len(ms) / elapsed, 2),
+        "rerun_ms": {f"p{int(q * 100)}": round(pct(ms, q), 1) for q in (0.5, 0.95, 0.99)},
+        "chat_turn_ms": {f"p{int(q * 100)}": round(pct(chat_ms, q), 1) for q in (0.5, 0.95, 0.99)},
+        "complete_ms": {f"p{int(q * 100)}": round(pct(complete_ms, q), 1) for q in (0.5, 0.95, 0.99)},
+        "session_wall_s_p50": round(pct(walls, 0.5), 2),
+        "threads_base": base_threads,
+        "threads_peak": sampler.peak_threads,
+        "rss_base_mb": round(base_rss / 1024, 1),
+        "rss_peak_mb": round(sampler.peak_rss_kb / 1024, 1),
+        "rss_growth_per_session_kb": round((end_rss - base_rss) / max(1, sessions), 1),
+        "llm": telemetry.recorder().aggregator.summary(),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=10, help="simulated students")
+    ap.add_argument("--concurrency", type=int, default=None, help="students active at once (default: all)")
+    ap.add_argument("--turns", type=int, default=2, help="chat turns per outline stage")
+    ap.add_argument("--out", help="also write the JSON report here")
+    args = ap.parse_args(argv)
+
+    report = run(args.sessions, args.concurrency or args.sessions, args.turns)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+# === END FILE: bench/load.py ===
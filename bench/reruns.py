@@ -0,0 +1,189 @@
+# === BEGIN FILE: bench/reruns.py ===
+"""Rerun benchmark: drives app.py with Streamlit's AppTest against the offline fake model.
+
+Walks Intro -> Key Pieces (submit) -> Outline (chat + Complete for each stage) and reports
+rerun wall time per step, bytes sent per streamed reply and memory held per session.
+
+    python -m bench.reruns                                 # print report
+    python -m bench.reruns --save bench/baseline.json      # record a baseline
+    python -m bench.reruns --baseline bench/baseline.json  # exit 1 on regression
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+STAGES = ("characters", "scenario", "conflict")
+
+# Offline model, fast enough that the benchmark measures the app rather than the model
+BENCH_ENV = {
+    "LLM_BACKEND": "fake",
+    "FAKE_TTFT_MS": "5",
+    "FAKE_TOKENS_PER_S": "20000",
+    "FAKE_REPLY_TOKENS": "120",
+    "TELEMETRY_PATH": "",
+}
+
+# Metrics compared against a baseline (lower is better) and how much worse is tolerated
+GATED = ("rerun_p50_ms", "rerun_p95_ms", "bytes_per_stream", "session_kb")
+
+
+def _env():
+    for k, v in BENCH_ENV.items():
+        os.environ.setdefault(k, v)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+
+class Session:
+    """One simulated student: an AppTest plus the tab it is looking at."""
+
+    def __init__(self, timeout: float = 60):
+        from streamlit.testing.v1 import AppTest
+        from ui.router import ACTIVE_TAB_KEY
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        self.tab_key = ACTIVE_TAB_KEY
+        self.tab = None
+        self.timings = []  # (step, seconds)
+
+    def _run(self, step: str, action=None):
+        # AppTest does not report tab clicks back, so re-assert the open tab before each run
+        if self.tab:
+            self.at.session_state[self.tab_key] = self.tab
+        t0 = time.perf_counter()
+        (action() if action else self.at.run())
+        self.timings.append((step, time.perf_counter() - t0))
+        if self.at.exception:
+            raise RuntimeError(f"{step}: {self.at.exception[0].value}")
+
+    def open(self, label: str):
+        self.tab = label
+        self._run(f"open {label}")
+
+    def submit_key_pieces(self, concept="Photosynthesis", level="Grade 5", genre="Mystery", setting="School greenhouse"):
+        self.open("🌱 Key Pieces")
+        inputs = {t.label: t for t in self.at.text_input}
+        inputs["Targeted Educational Level"].input(level)
+        inputs["Scientific Concept"].input(concept)
+        inputs["Genre"].input(genre)
+        inputs["Setting"].input(setting)
+        submit = next(b for b in self.at.button if "Submit" in b.label)
+        self._run("submit key pieces", submit.click().run)
+
+    def chat(self, text: str, step: str = "chat"):
+        self._run(step, self.at.chat_input[0].set_value(text).run)
+
+    def complete(self, stage: str):
+        btn = next(b for b in self.at.button if b.key == f"btn_{stage}")
+        self._run(f"complete {stage}", btn.click().run)
+
+    def walk(self, turns_per_stage: int = 3):
+        """The full Key Pieces -> Outline journey."""
+        self._run("first load")
+        self.submit_key_pieces()
+        self.open("💭 Outline")
+        for stage in STAGES:
+            for i in range(turns_per_stage):
+                self.chat(f"For the {stage}: idea {i}, Ana the botanist notices leaves turning toward a lamp.",
+                          step=f"chat {stage}")
+            self.complete(stage)
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] if values else 0.0
+
+
+def _session_bytes(turns_per_stage: int) -> int:
+    """Memory still held after one extra (warm) session finishes, via tracemalloc."""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    s = Session()
+    s.walk(turns_per_stage)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del s
+    return held
+
+
+def run(sessions: int = 3, turns_per_stage: int = 3) -> dict:
+    _env()
+    from llm import metrics
+
+    Session().walk(1)  # warm-up: imports, rules cache, prompt registry, prefix caches
+    before = metrics.snapshot("stream.")
+    timings = []
+    for _ in range(sessions):
+        s = Session()
+        s.walk(turns_per_stage)
+        timings.extend(s.timings)
+    after = metrics.snapshot("stream.")
+    held = _session_bytes(turns_per_stage)
+
+    def delta(k):
+        return after.get(k, 0) - before.get(k, 0)
+
+    replies = max(1, delta("stream.replies"))
+    ms = [t * 1000 for _, t in timings]
+    by_step = {}
+    for step, t in timings:
+        by_step.setdefault(step, []).append(t * 1000)
+    return {
+        "sessions": sessions,
+        "reruns": len(ms),
+        "rerun_p50_ms": round(_pct(ms, 0.5), 2),
+        "rerun_p95_ms": round(_pct(ms, 0.95), 2),
+        "rerun_max_ms": round(max(ms), 2),
+        "steps_ms": {k: round(statistics.median(v), 2) for k, v in by_step.items()},
+        "stream_replies": delta("stream.replies"),
+        "chunks_per_stream": round(delta("stream.chunks") / replies, 1),
+        "frames_per_stream": round(delta("stream.frames") / replies, 1),
+        "bytes_per_stream": round(delta("stream.bytes_sent") / replies, 1),
+        "session_kb": round(held / 1024, 1),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Gated metrics worse than baseline by more than tolerance (fraction)."""
+    failures = []
+    for key in GATED:
+        old, new = baseline.get(key), report.get(key)
+        if old and new is not None and new > old * (1 + tolerance):
+            failures.append(f"{key}: {new} > {old} (+{tolerance:.0%} allowed)")
+    return failures
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=3)
+    ap.add_argument("--turns", type=int, default=3, help="chat turns per outline stage")
+    ap.add_argument("--baseline", help="JSON report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed regression, e.g. 0.25 = 25%%")
+    ap.add_argument("--save", help="write the report to this path")
+    args = ap.parse_args(argv)
+
+    report = run(args.sessions, args.turns)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(report, json.load(f), args.tolerance)
+        for line in failures:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+# === END FILE: bench/reruns.py ===
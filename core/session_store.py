@@ -0,0 +1,167 @@
+# === BEGIN FILE: core/session_store.py ===
+# SQLite-backed durable session store, keyed by a student token.
+# Writes are queued and flushed in batches by one background thread (write-behind), so
+# the Streamlit script thread never waits on disk. Reads see queued writes first.
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+FLUSH_S = 1.0
+MAX_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    token TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    token TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    text TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    ts REAL NOT NULL,
+    PRIMARY KEY (token, seq)
+);
+"""
+
+
+class SessionStore:
+    def __init__(self, path: str, flush_s: float = FLUSH_S):
+        self.path = path
+        self.flush_s = flush_s
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+        self._ops = []          # ordered ("state" | "message" | "clear", token, payload)
+        self._state_at = {}     # token -> index of its pending "state" op (coalescing)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="session-store-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # ---------- queued writes ----------
+    def _queue(self, op) -> None:
+        with self._lock:
+            self._ops.append(op)
+            if len(self._ops) >= MAX_BATCH:
+                self._wake.set()
+
+    def save_state(self, token: str, state: dict) -> None:
+        """Queue the latest stage/form state (older queued states for the token are dropped)."""
+        payload = json.dumps(state, ensure_ascii=False)
+        with self._lock:
+            i = self._state_at.get(token)
+            if i is not None:
+                self._ops[i] = None
+            self._state_at[token] = len(self._ops)
+            self._ops.append(("state", token, payload))
+
+    def append_message(self, token: str, seq: int, msg) -> None:
+        self._queue(("message", token, (seq, msg.id, msg.role, msg.text, msg.stage, msg.ts)))
+
+    def clear_messages(self, token: str) -> None:
+        self._queue(("clear", token, None))
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_s)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything queued in one transaction; returns the number of operations."""
+        with self._flush_lock:
+            with self._lock:
+                ops, self._ops, self._state_at = self._ops, [], {}
+            ops = [op for op in ops if op is not None]
+            if not ops:
+                return 0
+            db = self._connect()
+            try:
+                with db:
+                    for kind, token, payload in ops:
+                        if kind == "state":
+                            db.execute("INSERT OR REPLACE INTO sessions (token, updated_at, state) VALUES (?, ?, ?)",
+                                       (token, time.time(), payload))
+                        elif kind == "message":
+                            db.execute("INSERT OR REPLACE INTO messages (token, seq, id, role, text, stage, ts) "
+                                       "VALUES (?, ?, ?, ?, ?, ?, ?)", (token, *payload))
+                        else:
+                            db.execute("DELETE FROM messages WHERE token = ?", (token,))
+            finally:
+                db.close()
+            return len(ops)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._wake.set()
+            self.flush()
+
+    # ---------- reads (flush first so a resume sees its own queued writes) ----------
+    def load_state(self, token: str):
+        self.flush()
+        db = self._connect()
+        try:
+            row = db.execute("SELECT state FROM sessions WHERE token = ?", (token,)).fetchone()
+        finally:
+            db.close()
+        return json.loads(row[0]) if row else None
+
+    def message_count(self, token: str) -> int:
+        self.flush()
+        db = self._connect()
+        try:
+            return db.execute("SELECT COUNT(*) FROM messages WHERE token = ?", (token,)).fetchone()[0]
+        finally:
+            db.close()
+
+    def load_messages(self, token: str, before_seq: int = None, limit: int = None) -> list:
+        """Export rows (see core.transcript) with seq < before_seq, newest `limit`, oldest first."""
+        self.flush()
+        sql = "SELECT id, role, text, stage, ts FROM messages WHERE token = ?"
+        args = [token]
+        if before_seq is not None:
+            sql += " AND seq < ?"
+            args.append(before_seq)
+        sql += " ORDER BY seq DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        db = self._connect()
+        try:
+            rows = db.execute(sql, args).fetchall()
+        finally:
+            db.close()
+        return [{"id": i, "role": r, "parts": t, "stage": s, "ts": ts} for i, r, t, s, ts in reversed(rows)]
+
+    def purge_older_than(self, days: float) -> int:
+        """Delete sessions (and their messages) untouched for `days`; returns sessions removed."""
+        self.flush()
+        cutoff = time.time() - days * 86400
+        db = self._connect()
+        try:
+            with db:
+                tokens = [r[0] for r in db.execute("SELECT token FROM sessions WHERE updated_at < ?", (cutoff,))]
+                db.executemany("DELETE FROM messages WHERE token = ?", [(t,) for t in tokens])
+                db.executemany("DELETE FROM sessions WHERE token = ?", [(t,) for t in tokens])
+        finally:
+            db.close()
+        return len(tokens)
+# === END FILE: core/session_store.py ===
@@ -0,0 +1,166 @@
+# === BEGIN FILE: core/transcript.py ===
+# Compact, stage-indexed chat transcript (replaces the list of {"role", "parts"} dicts).
+# Messages are grouped into contiguous per-stage segments; totals and the latest
+# user message per stage are maintained on append, so lookups never scan the list.
+import time
+import uuid
+
+CHARS_PER_TOKEN = 4  # rough Gemini average for English prose
+OUTLINE_STAGES = ("characters", "scenario", "conflict")  # Outline items, in order; then "done"
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class Message:
+    __slots__ = ("id", "role", "text", "stage", "tokens", "ts")
+
+    def __init__(self, role: str, text: str, stage: str = "", id: str = None, ts: float = None):
+        self.id = id or uuid.uuid4().hex[:12]
+        self.role = role            # "user" | "assistant"
+        self.text = text
+        self.stage = stage
+        self.tokens = estimate_tokens(text)
+        self.ts = ts if ts is not None else time.time()
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "role": self.role, "parts": self.text, "stage": self.stage, "ts": self.ts}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Message":
+        return cls(d["role"], d.get("parts", ""), d.get("stage", ""), id=d.get("id"), ts=d.get("ts"))
+
+
+class Segment:
+    """A contiguous run of messages belonging to one stage."""
+    __slots__ = ("stage", "messages", "chars", "tokens")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.messages = []
+        self.chars = 0
+        self.tokens = 0
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+
+class Transcript:
+    def __init__(self):
+        self.segments = []
+        self.chars = 0
+        self.tokens = 0
+        self._count = 0
+        self._latest_user = {}  # stage -> Message
+        self.unloaded = 0       # older messages still in the session store (lazy resume)
+        self._loader = None     # loader(before_seq, limit) -> export rows, oldest first
+
+    # ---------- writes ----------
+    def append(self, role: str, text: str, stage: str = "") -> Message:
+        return self._add(Message(role, text or "", stage))
+
+    def _add(self, msg: Message) -> Message:
+        seg = self.segments[-1] if self.segments else None
+        if seg is None or seg.stage != msg.stage:
+            seg = Segment(msg.stage)
+            self.segments.append(seg)
+        seg.messages.append(msg)
+        size = len(msg.text)
+        seg.chars += size
+        seg.tokens += msg.tokens
+        self.chars += size
+        self.tokens += msg.tokens
+        self._count += 1
+        if msg.role == "user":
+            self._latest_user[msg.stage] = msg
+        return msg
+
+    def truncate(self, keep_last: int) -> int:
+        """Drop all but the newest keep_last messages; returns how many were dropped."""
+        drop = self._count - max(0, keep_last)
+        if drop <= 0:
+            return 0
+        kept = list(self)[drop:]
+        unloaded, loader = self.unloaded, self._loader
+        self.__init__()
+        for msg in kept:
+            self._add(msg)
+        if loader is not None:  # dropped messages can still be paged back in from the store
+            self.attach_loader(unloaded + drop, loader)
+        return drop
+
+    def clear(self) -> None:
+        loader = self._loader  # the store is cleared alongside, so the loader stays valid
+        self.__init__()
+        self._loader = loader
+
+    # ---------- lazy loading ----------
+    def attach_loader(self, unloaded: int, loader) -> None:
+        """Mark the oldest `unloaded` messages as not loaded yet; loader fetches them on demand."""
+        self.unloaded = unloaded
+        self._loader = loader
+
+    def load_earlier(self, n: int) -> int:
+        """Prepend up to n older messages from the loader; returns how many arrived."""
+        if not self.unloaded or self._loader is None:
+            return 0
+        rows = self._loader(self.unloaded, n)
+        if not rows:
+            self.unloaded = 0
+            return 0
+        loaded = list(self)
+        unloaded, loader = self.unloaded - len(rows), self._loader
+        self.__init__()
+        for msg in [Message.from_dict(r) for r in rows] + loaded:
+            self._add(msg)
+        self.attach_loader(max(0, unloaded), loader)
+        return len(rows)
+
+    @property
+    def next_seq(self) -> int:
+        """Position the next appended message has in the full (stored) transcript."""
+        return self.unloaded + self._count
+
+    # ---------- reads ----------
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        for seg in self.segments:
+            yield from seg.messages
+
+    @property
+    def current_stage(self) -> str:
+        return self.segments[-1].stage if self.segments else ""
+
+    def latest_user(self, stage: str) -> str:
+        """Most recent user message of a stage, O(1)."""
+        msg = self._latest_user.get(stage)
+        return msg.text if msg else ""
+
+    def stage_segments(self, stage: str) -> list:
+        return [seg for seg in self.segments if seg.stage == stage]
+
+    def tail(self, n: int) -> list:
+        """Newest n messages across segments, oldest first (touches only what it returns)."""
+        out = []
+        for seg in reversed(self.segments):
+            need = n - len(out)
+            if need <= 0:
+                break
+            out[:0] = seg.messages[-need:]
+        return out
+
+    # ---------- export ----------
+    def export(self) -> list:
+        """Plain dicts (same keys as the old chat_history entries, plus id/stage/ts)."""
+        return [m.to_dict() for m in self]
+
+    @classmethod
+    def from_export(cls, rows) -> "Transcript":
+        t = cls()
+        for row in rows:
+            t._add(Message.from_dict(row))
+        return t
+# === END FILE: core/transcript.py ===
@@ -0,0 +1,185 @@
+# === BEGIN FILE: core/validation.py ===
+# Student-input validation: one pass over the text collects every character, word and
+# sentence statistic; gates are declarative lists of rules over those statistics, and
+# a failed rule reports a stable reason code. batch() scores many texts at once for
+# offline analysis and threshold tuning (no model calls).
+#
+#   python -m core.validation data/sessions.sqlite3    # score stored student messages
+import sqlite3
+import sys
+from collections import Counter
+from dataclasses import dataclass
+
+VOWELS = frozenset("aeiou")
+TERMINATORS = frozenset(".!?")
+
+
+class TextStats:
+    __slots__ = ("chars", "nonspace", "letters", "vowels", "distinct", "distinct_letters",
+                 "has_space", "words", "sentences")
+
+    @property
+    def gibberish(self) -> bool:
+        """Empty or random-like input (same heuristics the app has always used)."""
+        if not self.chars:
+            return True
+        if self.distinct <= 3 and self.chars >= 6:
+            return True
+        if not self.has_space and self.letters >= 6 and not self.vowels:
+            return True
+        if not self.has_space and self.letters >= 10 and self.distinct_letters <= 4:
+            return True
+        return self.nonspace > 0 and self.letters / self.nonspace < 0.5
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def analyze(text: str) -> TextStats:
+    """All statistics for the stripped text in a single pass."""
+    s = (text or "").strip()
+    distinct, distinct_letters = set(), set()
+    nonspace = letters = vowels = words = sentences = 0
+    has_space = in_word = word_alnum = pending_end = False
+    seg_letters = 0  # letters since the last sentence boundary
+    for c in s:
+        lc = c.lower()
+        distinct.add(lc)
+        if c.isspace():
+            has_space = has_space or c == " "
+            if in_word and word_alnum:
+                words += 1
+            in_word = word_alnum = False
+            if pending_end:  # ".", "!" or "?" followed by whitespace ends a sentence
+                sentences += 1
+                seg_letters = 0
+                pending_end = False
+            continue
+        nonspace += 1
+        in_word = True
+        if c.isalpha():
+            letters += 1
+            seg_letters += 1
+            distinct_letters.add(lc)
+            if lc in VOWELS:
+                vowels += 1
+        if c.isalnum():
+            word_alnum = True
+            pending_end = False  # "3.5", "e.g" and the like
+        elif c in TERMINATORS and seg_letters:
+            pending_end = True
+    if in_word and word_alnum:
+        words += 1
+    if seg_letters:
+        sentences += 1  # last sentence, with or without its full stop
+
+    st = TextStats()
+    st.chars, st.nonspace, st.letters, st.vowels = len(s), nonspace, letters, vowels
+    st.distinct, st.distinct_letters, st.has_space = len(distinct), len(distinct_letters), has_space
+    st.words, st.sentences = words, sentences
+    return st
+
+
+@dataclass(frozen=True)
+class Rule:
+    code: str      # reason code reported when the rule fails
+    stat: str      # TextStats attribute
+    op: str        # ">=", "<=", "=="
+    value: object
+    message: str   # student-facing hint
+
+    def passes(self, stats: TextStats) -> bool:
+        actual = getattr(stats, self.stat)
+        if self.op == ">=":
+            return actual >= self.value
+        if self.op == "<=":
+            return actual <= self.value
+        return actual == self.value
+
+
+NOT_GIBBERISH = Rule("gibberish", "gibberish", "==", False, "Please write real words and sentences.")
+
+# Gates from rules.txt (Key Pieces, Outline, Synopsis, Brainstorm, Draft)
+GATES = {
+    "concept": (NOT_GIBBERISH,),
+    "outline": (NOT_GIBBERISH,),
+    "synopsis": (
+        Rule("too_short", "chars", ">=", 100, "Write at least 100 characters."),
+        NOT_GIBBERISH,
+    ),
+    "brainstorm": (
+        Rule("too_short", "chars", ">=", 120, "Write at least 120 characters."),
+        Rule("too_few_sentences", "sentences", ">=", 2, "Use at least two sentences."),
+        NOT_GIBBERISH,
+    ),
+    "draft": (  # one focused paragraph of ~150–200 words (10% slack either side)
+        Rule("too_few_words", "words", ">=", 135, "Aim for about 150–200 words."),
+        Rule("too_many_words", "words", "<=", 220, "Keep it to one paragraph of about 150–200 words."),
+        NOT_GIBBERISH,
+    ),
+}
+
+
+@dataclass(frozen=True)
+class Verdict:
+    ok: bool
+    reasons: tuple   # failed rule codes, in rule order
+    messages: tuple  # matching student-facing hints
+    stats: TextStats
+
+
+def check(stats: TextStats, rules) -> Verdict:
+    failed = [r for r in rules if not r.passes(stats)]
+    return Verdict(not failed, tuple(r.code for r in failed), tuple(r.message for r in failed), stats)
+
+
+def validate(text: str, gate: str) -> Verdict:
+    return check(analyze(text), GATES[gate])
+
+
+def batch(texts, gates=None) -> dict:
+    """Score many texts against several gates (each text analyzed once).
+
+    Returns {"count", "stats": percentiles per statistic, "gates": {gate: {"pass", "rate", "reasons"}}}.
+    gates maps gate name -> rules, so candidate thresholds can be compared side by side.
+    """
+    gates = GATES if gates is None else gates
+    all_stats = [analyze(t) for t in texts]
+    report = {"count": len(all_stats), "stats": {}, "gates": {}}
+    for name in ("chars", "words", "sentences"):
+        values = sorted(getattr(s, name) for s in all_stats)
+        if values:
+            report["stats"][name] = {f"p{q}": values[min(len(values) - 1, len(values) * q // 100)]
+                                     for q in (10, 50, 90)}
+    for gate, rules in gates.items():
+        reasons, passed = Counter(), 0
+        for stats in all_stats:
+            verdict = check(stats, rules)
+            passed += verdict.ok
+            reasons.update(verdict.reasons)
+        report["gates"][gate] = {"pass": passed, "rate": round(passed / len(all_stats), 3) if all_stats else 0.0,
+                                 "reasons": dict(reasons)}
+    return report
+
+
+def main(argv=None) -> None:
+    import json
+
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else "data/sessions.sqlite3"
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute("SELECT stage, text FROM messages WHERE role = 'user'").fetchall()
+    finally:
+        db.close()
+    by_stage = {}
+    for stage, text in rows:
+        by_stage.setdefault(stage or "(none)", []).append(text)
+    out = {"all": batch([text for _, text in rows])}
+    out.update({f"stage:{stage}": batch(texts) for stage, texts in sorted(by_stage.items())})
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
+# === END FILE: core/validation.py ===
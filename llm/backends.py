@@ -0,0 +1,181 @@
+# === BEGIN FILE: llm/backends.py ===
+# Pluggable model backends behind llm.gateway. A backend only knows how to run one
+# stateless request (model + contents + config); chat state lives in the gateway.
+import threading
+from dataclasses import dataclass
+
+MAX_CONFIGS = 256  # native config objects kept per backend (one per distinct system prompt)
+
+
+@dataclass(frozen=True)
+class GenerationConfig:
+    """SDK-neutral request config (hashable so backends can cache their native form)."""
+    system_instruction: str = ""
+    temperature: float = 1.0
+    top_p: float = 1.0
+    top_k: int = 1
+    max_output_tokens: int = 2048
+    thinking_budget: int = None  # thinking tokens (count against max_output_tokens); None = model default
+    search: bool = False  # attach Google Search grounding
+    cached_content: str = ""  # name of a prefix cache holding system_instruction + tools
+
+
+def prefix_of(config: GenerationConfig) -> GenerationConfig:
+    """The cacheable part of a config: system instruction + tools, sampling knobs reset."""
+    return GenerationConfig(system_instruction=config.system_instruction, search=config.search)
+
+
+@dataclass
+class Chunk:
+    text: str = ""
+    usage: dict = None      # {"input", "output", "cached"} token counts, when the backend reports them
+    grounded: bool = False  # a search-grounded answer
+    sources: tuple = ()     # reply passages backed by search results (grounding supports)
+
+
+class Backend:
+    """Interface every backend implements. contents is a list of (role, text), role in {user, model}."""
+    name = "base"
+
+    def generate(self, model: str, contents: list, config: GenerationConfig) -> Chunk:
+        """Whole reply as a single Chunk."""
+        raise NotImplementedError
+
+    def stream(self, model: str, contents: list, config: GenerationConfig):
+        """Yield Chunk objects as the reply arrives."""
+        raise NotImplementedError
+
+    # Optional prefix caching (llm.context_cache); NotImplementedError means "not supported".
+    def create_cache(self, model: str, config: GenerationConfig, ttl_s: int) -> str:
+        """Cache config's system instruction + tools for ttl_s seconds; return the cache name."""
+        raise NotImplementedError
+
+    def refresh_cache(self, name: str, ttl_s: int) -> None:
+        raise NotImplementedError
+
+    def delete_cache(self, name: str) -> None:
+        raise NotImplementedError
+
+
+class GenAIBackend(Backend):
+    """google-genai SDK (the only Gemini SDK the app depends on)."""
+    name = "genai"
+
+    def __init__(self, api_key: str = None, client=None):
+        self._api_key = api_key
+        self._sdk_client = client
+        self._configs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def _client(self):
+        # Created on the first model call: importing google.genai costs ~0.8 s, which
+        # would otherwise land on the first page load of a fresh server process.
+        if self._sdk_client is None:
+            from llm import resources
+            self._sdk_client = resources.get_client(self._api_key)
+        return self._sdk_client
+
+    def _native_config(self, config: GenerationConfig):
+        with self._lock:
+            native = self._configs.get(config)
+            if native is None:
+                from google.genai import types
+                # With a cached prefix, system instruction and tools live in the cache
+                # and must not be resent.
+                inline = not config.cached_content
+                native = types.GenerateContentConfig(
+                    system_instruction=(config.system_instruction or None) if inline else None,
+                    tools=self._tools(config) if inline else None,
+                    cached_content=config.cached_content or None,
+                    temperature=config.temperature,
+                    top_p=config.top_p,
+                    top_k=config.top_k,
+                    max_output_tokens=config.max_output_tokens,
+                    thinking_config=(types.ThinkingConfig(thinking_budget=config.thinking_budget)
+                                     if config.thinking_budget is not None else None),
+                )
+                if len(self._configs) >= MAX_CONFIGS:
+                    self._configs.clear()
+                self._configs[config] = native
+            return native
+
+    @staticmethod
+    def _tools(config: GenerationConfig):
+        if not config.search:
+            return None
+        from google.genai import types
+        return [types.Tool(google_search=types.GoogleSearch())]
+
+    @staticmethod
+    def _contents(contents: list):
+        from google.genai import types
+        return [types.Content(role=role, parts=[types.Part(text=text)]) for role, text in contents]
+
+    @staticmethod
+    def _chunk(resp) -> Chunk:
+        meta = getattr(resp, "usage_metadata", None)
+        usage = None
+        if meta is not None:
+            usage = {
+                "input": meta.prompt_token_count or 0,
+                "output": meta.candidates_token_count or 0,
+                "cached": meta.cached_content_token_count or 0,
+            }
+        grounded, sources = False, []
+        for c in getattr(resp, "candidates", None) or []:
+            meta = getattr(c, "grounding_metadata", None)
+            if meta is None:
+                continue
+            grounded = grounded or bool(getattr(meta, "web_search_queries", None))
+            for support in getattr(meta, "grounding_supports", None) or []:
+                text = getattr(getattr(support, "segment", None), "text", None)
+                if text:
+                    sources.append(text)
+        return Chunk(text=getattr(resp, "text", None) or "", usage=usage, grounded=grounded, sources=tuple(sources))
+
+    def generate(self, model, contents, config):
+        resp = self._client.models.generate_content(
+            model=model, contents=self._contents(contents), config=self._native_config(config)
+        )
+        return self._chunk(resp)
+
+    def stream(self, model, contents, config):
+        for chunk in self._client.models.generate_content_stream(
+            model=model, contents=self._contents(contents), config=self._native_config(config)
+        ):
+            yield self._chunk(chunk)
+
+    def create_cache(self, model, config, ttl_s):
+        from google.genai import types
+        cache = self._client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=config.system_instruction,
+                tools=self._tools(config),
+                ttl=f"{int(ttl_s)}s",
+                display_name="inspirabot-prefix",
+            ),
+        )
+        return cache.name
+
+    def refresh_cache(self, name, ttl_s):
+        from google.genai import types
+        self._client.caches.update(name=name, config=types.UpdateCachedContentConfig(ttl=f"{int(ttl_s)}s"))
+
+    def delete_cache(self, name):
+        self._client.caches.delete(name=name)
+
+
+def _fake_backend(api_key: str = None) -> Backend:
+    from llm.fake import FakeBackend  # only imported when LLM_BACKEND=fake
+    return FakeBackend(api_key)
+
+
+# name -> factory(api_key) -> Backend
+BACKENDS = {"genai": GenAIBackend, "fake": _fake_backend}
+
+
+def register_backend(name: str, factory) -> None:
+    BACKENDS[name] = factory
+# === END FILE: llm/backends.py ===
@@ -0,0 +1,102 @@
+# === BEGIN FILE: llm/background.py ===
+# Shared worker pool for model work that should not block a rerun, plus a memo of
+# speculative results (e.g. Outline reframes computed before "Complete" is pressed).
+# Jobs run outside any Streamlit script thread: pass them plain values, never st.session_state.
+import contextvars
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from llm import metrics, settings
+
+DEFAULT_WORKERS = 4
+MAX_MEMO = 1024
+
+_executor = None
+_lock = threading.Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.get_int("BACKGROUND_WORKERS", DEFAULT_WORKERS),
+                thread_name_prefix="inspirabot-bg",
+            )
+        return _executor
+
+
+class Speculator:
+    """Memoized background jobs, one live job per slot.
+
+    A slot is "what this session is currently waiting on" (e.g. session + stage).
+    Prefetching a new key into a slot cancels the slot's previous job if it has not
+    started yet; finished results stay memoized by key.
+    """
+
+    def __init__(self, max_size: int = MAX_MEMO):
+        self._memo = OrderedDict()  # key -> Future
+        self._slots = {}            # slot -> key
+        self._max = max_size
+        self._lock = threading.Lock()
+
+    def prefetch(self, slot, key, fn, *args):
+        with self._lock:
+            fut = self._memo.get(key)
+            if fut is not None and not (fut.done() and (fut.cancelled() or fut.exception())):
+                self._memo.move_to_end(key)
+                self._slots[slot] = key
+                return fut
+            old_key = self._slots.get(slot)
+            if old_key is not None and old_key != key:
+                old = self._memo.get(old_key)
+                if old is not None and old.cancel():
+                    self._memo.pop(old_key, None)
+                    metrics.incr("speculative.cancelled")
+            # copy_context(): telemetry tags (tab/stage/session) follow the job onto the worker
+            fut = executor().submit(contextvars.copy_context().run, fn, *args)
+            self._memo[key] = fut
+            self._slots[slot] = key
+            while len(self._memo) > self._max:
+                self._memo.popitem(last=False)
+        metrics.incr("speculative.submitted")
+        return fut
+
+    def result(self, key, timeout: float):
+        """Memoized result for key, waiting up to timeout for an in-flight job; None on miss/failure."""
+        with self._lock:
+            fut = self._memo.get(key)
+        if fut is None:
+            metrics.incr("speculative.miss")
+            return None
+        name = "speculative.hit" if fut.done() else "speculative.waited"
+        try:
+            value = fut.result(timeout=timeout)
+        except TimeoutError:
+            metrics.incr("speculative.timeout")
+            return None
+        except Exception:  # includes CancelledError
+            with self._lock:
+                self._memo.pop(key, None)
+            metrics.incr("speculative.failed")
+            return None
+        metrics.incr(name)
+        return value
+
+    def peek(self, key):
+        """Finished result for key without waiting; None while running, on miss or on failure."""
+        with self._lock:
+            fut = self._memo.get(key)
+        if fut is None or not fut.done() or fut.cancelled() or fut.exception():
+            return None
+        return fut.result()
+
+    def release(self, slot) -> None:
+        """Slot finished (e.g. stage completed): cancel its job if still queued."""
+        with self._lock:
+            key = self._slots.pop(slot, None)
+            fut = self._memo.get(key) if key is not None else None
+        if fut is not None and fut.cancel():
+            metrics.incr("speculative.cancelled")
+# === END FILE: llm/background.py ===
@@ -0,0 +1,111 @@
+# === BEGIN FILE: llm/compaction.py ===
+# Rolling compaction of a ChatSession's model-side history under a token budget.
+# Every turn resends the whole history, so once it grows past the budget:
+#   1. finished stages collapse to their saved reframe (outline_summary), or to a
+#      generated summary when there is none (kept in chat.summaries, so it is made once);
+#   2. if still over budget, older turns of the current stage are folded into one
+#      rolling summary, keeping the most recent KEEP_RECENT turns verbatim.
+# Turns that already are summaries are never summarized on their own again.
+from itertools import groupby
+
+from core.transcript import estimate_tokens
+from llm import metrics, settings
+
+DEFAULT_BUDGET = 8000  # history tokens resent per turn (system prefix excluded: it is cached)
+KEEP_RECENT = 6        # newest turns of the current stage never summarized
+
+SUMMARY_PROMPT = (
+    "Summarize this part of a tutoring conversation about an educational science story "
+    "in at most 120 words. Keep the student's own ideas, names and decisions; add nothing new.\n\n"
+)
+
+
+def history_tokens(history) -> int:
+    return sum(estimate_tokens(text) for _, text, _ in history)
+
+
+SUMMARY_MARK = "(Summary of "
+SUMMARY_ACK = "Noted."
+
+
+def summary_turns(stage: str, summary: str) -> list:
+    """The (user, model) pair that stands in for a stage's turns (also built on resume)."""
+    label = stage.title() if stage else "Earlier conversation"
+    return [
+        ("user", f"{SUMMARY_MARK}{label} so far — already agreed, do not repeat it back:)\n{summary}", stage),
+        ("model", SUMMARY_ACK, stage),
+    ]
+
+
+def _is_summary(turns, i: int) -> bool:
+    """turns[i] belongs to a summary pair made by summary_turns."""
+    role, text, _ = turns[i]
+    if role == "user":
+        return text.startswith(SUMMARY_MARK)
+    return text == SUMMARY_ACK and i > 0 and _is_summary(turns, i - 1)
+
+
+def _transcript(turns) -> str:
+    return "\n".join(f"{'Student' if role == 'user' else 'Assistant'}: {text}" for role, text, _ in turns)
+
+
+def _try(summarize, turns):
+    """Generated summary turns, or None if the model call failed (turns are then kept as-is)."""
+    try:
+        summary = summarize(_transcript(turns))
+    except Exception:
+        metrics.incr("compaction.errors")
+        return None
+    metrics.incr("compaction.generated_summaries")
+    return summary or None
+
+
+def compact(chat, budget: int, summarize=None) -> bool:
+    """Rewrite chat.history in place if it exceeds budget; returns True if it changed.
+
+    summarize(text) -> str is only used where no saved stage summary exists.
+    """
+    before = history_tokens(chat.history)
+    if before <= budget:
+        return False
+
+    out = []
+    for stage, turns in groupby(chat.history, key=lambda t: t[2]):
+        turns = list(turns)
+        if stage == chat.stage:
+            out.extend(turns)
+        elif chat.summaries.get(stage):
+            out.extend(summary_turns(stage, chat.summaries[stage]))
+        elif all(_is_summary(turns, i) for i in range(len(turns))):
+            out.extend(turns)
+        else:
+            summary = _try(summarize, turns) if summarize is not None else None
+            if summary:
+                chat.summaries[stage] = summary  # reused as is on later turns
+            out.extend(summary_turns(stage, summary) if summary else turns)
+
+    # Still too big: fold the older part of the current stage (and its earlier rolling
+    # summary, if any) into one rolling summary; nothing new to fold means no call
+    if summarize is not None and history_tokens(out) > budget:
+        head = [i for i, t in enumerate(out) if t[2] == chat.stage]
+        older = head[:-KEEP_RECENT] if len(head) > KEEP_RECENT else []
+        if any(not _is_summary(out, i) for i in older):
+            lo, hi = older[0], older[-1] + 1
+            summary = _try(summarize, out[lo:hi])
+            if summary:
+                out[lo:hi] = summary_turns(chat.stage, summary)
+
+    if out == chat.history:
+        return False
+    chat.history = out
+    chat.compactions += 1
+    after = history_tokens(out)
+    metrics.incr("compaction.runs")
+    metrics.incr("compaction.tokens_before", before)
+    metrics.incr("compaction.tokens_after", after)
+    return True
+
+
+def budget_from_settings() -> int:
+    return settings.get_int("HISTORY_TOKEN_BUDGET", DEFAULT_BUDGET)
+# === END FILE: llm/compaction.py ===
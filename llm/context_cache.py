@@ -0,0 +1,119 @@
+# === BEGIN FILE: llm/context_cache.py ===
+# Prefix (context) caching for the big static part of every request: rules.txt, plus the
+# Key Pieces brief once a student submits it. Caches are keyed by model + system
+# instruction + tools, so the rules-only prefix is created once per process and each
+# brief once per session (or once per identical brief). A failed create falls back to
+# sending the system instruction inline; so does a request whose cache has vanished.
+import threading
+import time
+from dataclasses import dataclass, replace
+
+from llm import metrics, settings
+from llm.backends import prefix_of
+
+DEFAULT_TTL_S = 3600
+REFRESH_MARGIN_S = 120   # extend a cache that is about to expire instead of letting it lapse
+MIN_CHARS = 4000         # Gemini rejects caches below ~1k tokens; don't bother for short prompts
+RETRY_AFTER_S = 600      # after a failed create, send inline for this long before retrying
+MAX_ENTRIES = 512
+
+
+@dataclass
+class _Entry:
+    name: str
+    expires_at: float
+
+
+def is_cache_miss(exc: BaseException) -> bool:
+    """The request failed because its cached prefix is gone (expired or deleted).
+
+    Gemini answers 404 (or 400/403) naming the cachedContents resource; anything else
+    (quota, timeouts, server errors) is not a cache problem.
+    """
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return code in (400, 403, 404) and "cachedcontent" in str(exc).lower()
+
+
+class PrefixCache:
+    def __init__(self, backend, ttl_s: int = DEFAULT_TTL_S, enabled: bool = True):
+        self.backend = backend
+        self.ttl_s = ttl_s
+        self.enabled = enabled
+        self._entries = {}       # (model, prefix config) -> _Entry
+        self._retry_at = {}      # (model, prefix config) -> time a failed create may be retried
+        self._key_locks = {}     # one create at a time per key (no thundering herd)
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def resolve(self, model: str, config):
+        """Return config pointing at a live cache for its prefix, or config unchanged."""
+        if not self.enabled or config.cached_content or len(config.system_instruction) < MIN_CHARS:
+            return config
+        key = (model, prefix_of(config))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now < entry.expires_at - REFRESH_MARGIN_S:
+                metrics.incr("context_cache.hit")
+                return replace(config, cached_content=entry.name)
+            if self._retry_at.get(key, 0) > now:
+                metrics.incr("context_cache.inline")
+                return config
+
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._entries.get(key)
+            now = time.time()
+            if entry and now < entry.expires_at - REFRESH_MARGIN_S:  # another session just made it
+                metrics.incr("context_cache.hit")
+                return replace(config, cached_content=entry.name)
+            try:
+                if entry and now < entry.expires_at:
+                    self.backend.refresh_cache(entry.name, self.ttl_s)
+                    metrics.incr("context_cache.refresh")
+                else:
+                    entry = _Entry(self.backend.create_cache(model, config, self.ttl_s), 0)
+                    metrics.incr("context_cache.create")
+            except NotImplementedError:
+                self.enabled = False  # backend has no caching at all
+                metrics.incr("context_cache.unsupported")
+                return config
+            except Exception:
+                with self._lock:
+                    self._entries.pop(key, None)
+                    self._retry_at[key] = now + RETRY_AFTER_S
+                metrics.incr("context_cache.error")
+                return config
+            entry.expires_at = now + self.ttl_s
+            with self._lock:
+                self._entries[key] = entry
+                self._retry_at.pop(key, None)
+                if len(self._entries) > MAX_ENTRIES:
+                    self._prune(now)
+            return replace(config, cached_content=entry.name)
+
+    def invalidate(self, name: str) -> None:
+        """Forget a cache the server no longer recognizes (expired/deleted)."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.name == name]:
+                del self._entries[key]
+        metrics.incr("context_cache.invalidate")
+
+    def _prune(self, now: float) -> None:
+        for key in [k for k, e in self._entries.items() if e.expires_at <= now]:
+            del self._entries[key]
+            self._key_locks.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "enabled": self.enabled}
+
+
+def from_settings(backend) -> PrefixCache:
+    """CONTEXT_CACHE=0 turns caching off; CONTEXT_CACHE_TTL_S sets the TTL."""
+    enabled = str(settings.get("CONTEXT_CACHE", "1")).lower() not in ("0", "false", "off", "no")
+    return PrefixCache(backend, ttl_s=settings.get_int("CONTEXT_CACHE_TTL_S", DEFAULT_TTL_S), enabled=enabled)
+# === END FILE: llm/context_cache.py ===
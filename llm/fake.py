@@ -0,0 +1,178 @@
+# === BEGIN FILE: llm/fake.py ===
+# Deterministic offline stand-in for the google-genai client, for benchmarks, load tests
+# and local runs without an API key (LLM_BACKEND=fake). It mirrors the SDK surface the app
+# touches: client.chats.create(...).send_message / send_message_stream,
+# client.models.generate_content / generate_content_stream, client.caches.*.
+# Latency, token rate and errors are configurable; replies depend only on the seed + input,
+# injected errors on the seed + call order.
+import random
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+
+from llm import settings
+from llm.backends import GenAIBackend
+
+WORDS = (
+    "What if your character noticed something unexpected about the light in the greenhouse? "
+    "Try giving them a small habit that connects to the science. Why might the setting make "
+    "that harder? As if the plants could answer, what would they say? Keep it short and curious."
+).split()
+
+
+class FakeAPIError(Exception):
+    """Injected failure; .code mimics the SDK's HTTP status (429 by default)."""
+
+    def __init__(self, code: int = 429, message: str = "RESOURCE_EXHAUSTED (injected by fake backend)"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def _text_of(contents) -> str:
+    """Flatten str / (role, text) / types.Content inputs into one string."""
+    if isinstance(contents, str):
+        return contents
+    out = []
+    for c in contents or []:
+        if isinstance(c, str):
+            out.append(c)
+        elif isinstance(c, tuple):
+            out.append(c[-1])
+        else:
+            out.extend(getattr(p, "text", "") or "" for p in getattr(c, "parts", None) or [])
+    return "\n".join(out)
+
+
+def _response(text: str, prompt_tokens: int, output_tokens: int, cached_tokens: int):
+    usage = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=output_tokens,
+                            cached_content_token_count=cached_tokens)
+    return SimpleNamespace(text=text, usage_metadata=usage, candidates=[])
+
+
+class FakeModels:
+    def __init__(self, client):
+        self._c = client
+
+    def generate_content(self, model, contents, config=None):
+        chunks = list(self.generate_content_stream(model, contents, config))
+        text = "".join(c.text for c in chunks)
+        last = chunks[-1].usage_metadata
+        return _response(text, last.prompt_token_count, last.candidates_token_count, last.cached_content_token_count)
+
+    def generate_content_stream(self, model, contents, config=None):
+        c = self._c
+        prompt = _text_of(contents)
+        system = getattr(config, "system_instruction", None) or ""
+        cached = c.caches.tokens(getattr(config, "cached_content", None))
+        prompt_tokens = (len(prompt) + len(system)) // 4 + cached
+        rng = random.Random(c.seed ^ zlib.crc32(prompt.encode("utf-8")))
+        c.calls += 1
+        time.sleep(c.ttft_s)
+        if c.error_rate and c.next_error_roll() < c.error_rate:
+            raise FakeAPIError(c.error_code)
+        words = [rng.choice(WORDS) for _ in range(c.reply_tokens)]
+        sent = 0
+        for i in range(0, len(words), c.chunk_tokens):
+            piece = words[i:i + c.chunk_tokens]
+            if i:
+                time.sleep(len(piece) / c.tokens_per_s)
+            sent += len(piece)
+            yield _response(" ".join(piece) + " ", prompt_tokens, sent, cached)
+
+
+class FakeChat:
+    def __init__(self, client, model, config=None, history=None):
+        self._c, self._model, self._config = client, model, config
+        self.history = list(history or [])  # [(role, text)]
+
+    def send_message(self, message):
+        resp = self._c.models.generate_content(self._model, self.history + [("user", _text_of([message]))], self._config)
+        self.history += [("user", _text_of([message])), ("model", resp.text)]
+        return resp
+
+    def send_message_stream(self, message):
+        parts = []
+        for chunk in self._c.models.generate_content_stream(
+            self._model, self.history + [("user", _text_of([message]))], self._config
+        ):
+            parts.append(chunk.text)
+            yield chunk
+        self.history += [("user", _text_of([message])), ("model", "".join(parts))]
+
+
+class FakeChats:
+    def __init__(self, client):
+        self._c = client
+
+    def create(self, model, config=None, history=None):
+        return FakeChat(self._c, model, config, history)
+
+
+class FakeCaches:
+    def __init__(self):
+        self._items = {}  # name -> (tokens, expires_at)
+
+    def create(self, model, config=None):
+        name = f"cachedContents/fake-{len(self._items) + 1}"
+        tokens = len(getattr(config, "system_instruction", None) or "") // 4
+        self._items[name] = (tokens, time.time() + float(str(getattr(config, "ttl", "3600s")).rstrip("s")))
+        return SimpleNamespace(name=name)
+
+    def update(self, name, config=None):
+        tokens, _ = self._items[name]
+        self._items[name] = (tokens, time.time() + float(str(getattr(config, "ttl", "3600s")).rstrip("s")))
+
+    def delete(self, name):
+        self._items.pop(name, None)
+
+    def tokens(self, name) -> int:
+        if not name:
+            return 0
+        tokens, expires_at = self._items.get(name, (0, 0))
+        if time.time() >= expires_at:
+            raise FakeAPIError(404, f"{name} not found or expired")
+        return tokens
+
+
+class FakeClient:
+    def __init__(self, ttft_ms: float = 300, tokens_per_s: float = 80, reply_tokens: int = 60,
+                 chunk_tokens: int = 5, error_rate: float = 0.0, error_code: int = 429, seed: int = 0):
+        self.ttft_s = ttft_ms / 1000
+        self.tokens_per_s = max(tokens_per_s, 1e-6)
+        self.reply_tokens = reply_tokens
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.seed = seed
+        self.calls = 0
+        self._errors = random.Random(seed)  # per-call sequence, so a retried request can succeed
+        self._errors_lock = threading.Lock()
+        self.models = FakeModels(self)
+        self.chats = FakeChats(self)
+        self.caches = FakeCaches()
+
+    def next_error_roll(self) -> float:
+        with self._errors_lock:
+            return self._errors.random()
+
+
+def client_from_settings() -> FakeClient:
+    return FakeClient(
+        ttft_ms=settings.get_float("FAKE_TTFT_MS", 300),
+        tokens_per_s=settings.get_float("FAKE_TOKENS_PER_S", 80),
+        reply_tokens=settings.get_int("FAKE_REPLY_TOKENS", 60),
+        chunk_tokens=settings.get_int("FAKE_CHUNK_TOKENS", 5),
+        error_rate=settings.get_float("FAKE_ERROR_RATE", 0.0),
+        error_code=settings.get_int("FAKE_ERROR_CODE", 429),
+        seed=settings.get_int("FAKE_SEED", 0),
+    )
+
+
+class FakeBackend(GenAIBackend):
+    """The real google-genai backend code path, pointed at FakeClient (no network, no key)."""
+    name = "fake"
+
+    def __init__(self, api_key: str = None, client: FakeClient = None):
+        super().__init__(client=client or client_from_settings())
+# === END FILE: llm/fake.py ===
@@ -0,0 +1,293 @@
+# === BEGIN FILE: llm/gateway.py ===
+# Single entry point for every model call (chat turns, one-shot generation, streaming).
+# Tabs never import an SDK directly; they call get_gateway() and pass ChatSession objects.
+import contextvars
+import threading
+from dataclasses import dataclass, field, replace
+
+from llm import background, compaction, context_cache, grounding, metrics, resilience, routing, scheduler, settings, telemetry
+from llm.backends import BACKENDS, GenerationConfig
+
+
+@dataclass
+class ChatSession:
+    """Per-student conversation state. History is kept here, not in an SDK chat object."""
+    model: str
+    config: GenerationConfig
+    prompt_version: str = ""
+    history: list = field(default_factory=list)  # [(role, text, stage)], role in {"user", "model"}
+    directive: str = ""  # hidden instruction folded into the next user turn (then cleared)
+    stage: str = ""      # stage the next turns belong to
+    summaries: dict = field(default_factory=dict)  # stage -> saved reframe, used by compaction
+    compactions: int = 0
+    topic: str = ""      # Key Pieces concept: selective grounding + shared fact cache key
+
+    def contents(self, turn: str) -> list:
+        """History + the new user turn, in the (role, text) form backends take."""
+        return [(role, text) for role, text, _ in self.history] + [("user", turn)]
+
+
+class LLMGateway:
+    def __init__(self, backend, prefix_cache=None, history_budget: int = compaction.DEFAULT_BUDGET,
+                 call_scheduler=None, router=None, facts=None, policy=None):
+        self.backend = backend
+        self.prefix_cache = prefix_cache or context_cache.PrefixCache(backend, enabled=False)
+        self.history_budget = history_budget
+        self.scheduler = call_scheduler or scheduler.Scheduler()
+        self.router = router or routing.Router()
+        self.facts = facts or grounding.FactCache()
+        self.policy = policy or resilience.Policy()
+
+    # ---------- backend calls ----------
+    # route (model pick, fallback model) > circuit breaker > telemetry span > scheduler
+    # (queue, rate limit, 429 retry) > deadlines + hedging > prefix cache (+ inline resend if it expired)
+    def _generate_once(self, model, contents, config, span):
+        resolved = self.prefix_cache.resolve(model, config)
+        span.rec.prefix_cached = bool(resolved.cached_content)
+        try:
+            return self.backend.generate(model, contents, resolved)
+        except Exception as e:
+            # Quota errors, timeouts etc. go up to the scheduler and breaker; only a vanished
+            # cache is worth resending inline.
+            if not resolved.cached_content or not context_cache.is_cache_miss(e):
+                raise
+            self.prefix_cache.invalidate(resolved.cached_content)
+            metrics.incr("context_cache.fallback")
+            span.rec.prefix_cached = False
+            return self.backend.generate(model, contents, config)
+
+    def _stream_once(self, model, contents, config, span):
+        resolved = self.prefix_cache.resolve(model, config)
+        span.rec.prefix_cached = bool(resolved.cached_content)
+        started = False
+        try:
+            for chunk in self.backend.stream(model, contents, resolved):
+                started = True
+                yield chunk
+        except Exception as e:
+            # Only retry inline if nothing was shown yet; a half-streamed reply can't be replayed.
+            if started or not resolved.cached_content or not context_cache.is_cache_miss(e):
+                raise
+            self.prefix_cache.invalidate(resolved.cached_content)
+            metrics.incr("context_cache.fallback")
+            span.rec.prefix_cached = False
+            yield from self.backend.stream(model, contents, config)
+
+    def _generate(self, model, contents, config, purpose: str, stage: str = None, priority: int = None):
+        model = self.router.model_for(purpose, model)
+        try:
+            return self._generate_on(model, contents, config, purpose, stage, priority)
+        except Exception:
+            fallback = self.router.fallback_for(purpose, model)
+            if not fallback:
+                raise
+            metrics.incr(f"routing.{purpose}.fallback")
+            return self._generate_on(fallback, contents, config, purpose, stage, priority)
+
+    def _stream(self, model, contents, config, purpose: str, stage: str = None):
+        model = self.router.model_for(purpose, model)
+        started = False
+        try:
+            for chunk in self._stream_on(model, contents, config, purpose, stage):
+                started = True
+                yield chunk
+        except Exception:
+            fallback = self.router.fallback_for(purpose, model)
+            if started or not fallback:
+                raise
+            metrics.incr(f"routing.{purpose}.fallback")
+            yield from self._stream_on(fallback, contents, config, purpose, stage)
+
+    def _generate_on(self, model, contents, config, purpose: str, stage: str = None, priority: int = None):
+        """priority defaults to the purpose's; a call a waiting student depends on passes theirs."""
+        self.policy.breaker.check(model)
+        metrics.incr(f"llm.calls.{purpose}")
+        span = telemetry.Span(purpose, model, "generate", stage=stage)
+        try:
+            reply = self.scheduler.run(
+                lambda: self.policy.call(model, purpose, lambda: self._generate_once(model, contents, config, span),
+                                         slots=self.scheduler),
+                session=span.rec.session, on_wait=span.queued,
+                priority=scheduler.priority_for(purpose) if priority is None else priority,
+            )
+            span.chunk(reply)
+            rec = span.finish()
+            self.router.observe(purpose, model, rec.latency_ms - rec.queue_ms)
+            return reply
+        except Exception as e:
+            span.fail(e)
+            raise
+        finally:
+            span.finish()
+
+    def _stream_on(self, model, contents, config, purpose: str, stage: str = None):
+        self.policy.breaker.check(model)
+        metrics.incr(f"llm.calls.{purpose}")
+        span = telemetry.Span(purpose, model, "stream", stage=stage)
+        try:
+            for chunk in self.scheduler.stream(
+                lambda: self.policy.stream(model, purpose, lambda: self._stream_once(model, contents, config, span),
+                                           slots=self.scheduler),
+                session=span.rec.session, priority=scheduler.priority_for(purpose), on_wait=span.queued,
+            ):
+                span.chunk(chunk)
+                yield chunk
+            if span.rec.ttft_ms is not None:
+                self.router.observe(purpose, model, span.rec.ttft_ms - span.rec.queue_ms)
+        except GeneratorExit:
+            span.fail(GeneratorExit("stream abandoned by caller"))
+            raise
+        except Exception as e:
+            span.fail(e)
+            raise
+        finally:
+            span.finish()
+
+    # ---------- chat ----------
+    def start_chat(self, prompt, model: str = None, history=None, topic: str = "") -> ChatSession:
+        """New chat bound to a registered SystemPrompt (llm.resources); model/config from the chat route."""
+        route = self.router.route("chat")
+        model = model or route.model
+        span = telemetry.Span("session_create", model, "session")
+        chat = ChatSession(
+            model=model,
+            config=GenerationConfig(system_instruction=prompt.text, **route.config),
+            prompt_version=prompt.version,
+            history=[(t[0], t[1], t[2] if len(t) > 2 else "") for t in history or []],
+            topic=topic or "",
+        )
+        span.finish()
+        return chat
+
+    def set_prompt(self, chat: ChatSession, prompt) -> None:
+        """Swap the chat's system instruction (e.g. once the concept primer is ready); history is kept."""
+        if chat.prompt_version != prompt.version:
+            chat.config = replace(chat.config, system_instruction=prompt.text)
+            chat.prompt_version = prompt.version
+
+    def set_summary(self, chat: ChatSession, stage: str, summary: str) -> None:
+        """Saved reframe for a finished stage; compaction replaces that stage with it."""
+        chat.summaries[stage] = summary
+
+    def _summarize(self, text: str, priority: int) -> str:
+        route = self.router.route("compaction")
+        cfg = GenerationConfig(**route.config)
+        return self._generate(route.model, [("user", compaction.SUMMARY_PROMPT + text)], cfg, "compaction",
+                              priority=priority).text.strip()
+
+    def _before_turn(self, chat: ChatSession, stage, purpose: str):
+        if stage is not None:
+            chat.stage = stage
+        # The student's reply waits on these summaries, so they queue at the turn's priority
+        # (a "compaction" call on its own would be BACKGROUND and sit behind every other stream).
+        priority = scheduler.priority_for(purpose)
+        compaction.compact(chat, self.history_budget, summarize=lambda text: self._summarize(text, priority))
+
+    def set_directive(self, chat: ChatSession, directive: str) -> None:
+        """Queue a hidden instruction for the next user turn (no model call now)."""
+        chat.directive = directive
+        metrics.incr("llm.directives.queued")
+
+    @staticmethod
+    def _user_turn(chat: ChatSession, text: str) -> str:
+        """The user content actually sent: pending directive (if any) + the student's text."""
+        if not chat.directive:
+            return text
+        metrics.incr("llm.directives.folded")
+        return (
+            "(Hidden instruction for assistant. Follow it, do not mention it.)\n"
+            f"{chat.directive}\n\n(Student message:)\n{text}"
+        )
+
+    def _grounding(self, chat: ChatSession, text: str) -> tuple:
+        """(config, preface) for a turn: search only for factual questions, cached facts before a repeat search."""
+        if not chat.config.search:
+            return chat.config, ""
+        if not grounding.needs_search(text, chat.topic):
+            metrics.incr("grounding.skipped")
+            return replace(chat.config, search=False), ""
+        facts = self.facts.get(chat.topic, text) if grounding.cacheable(text, chat.topic) else ""
+        if facts:
+            metrics.incr("grounding.cache_hit")
+            return replace(chat.config, search=False), grounding.facts_note(facts)
+        metrics.incr("grounding.searched")
+        return chat.config, ""
+
+    def _share_facts(self, topic: str, question: str, sources, reply: str) -> None:
+        """After a grounded turn: extract story-free facts in the background for the fact cache."""
+        if not grounding.cacheable(question, topic):
+            metrics.incr("grounding.not_shared")
+            return
+        passages = "\n".join(sources) or reply
+        background.executor().submit(contextvars.copy_context().run, self._extract_facts, topic, question, passages)
+
+    def _extract_facts(self, topic: str, question: str, passages: str) -> None:
+        try:
+            facts = grounding.clean_facts(self.generate(grounding.extract_prompt(question, passages), purpose="facts"))
+        except Exception:
+            metrics.incr("grounding.extract_errors")
+            return
+        if facts:
+            self.facts.put(topic, question, facts)
+
+    def send(self, chat: ChatSession, text: str, purpose: str = "chat", stage: str = None) -> str:
+        """Blocking chat turn; the exchange is appended to chat.history."""
+        self._before_turn(chat, stage, purpose)
+        turn = self._user_turn(chat, text)
+        config, preface = self._grounding(chat, text)
+        reply = self._generate(chat.model, chat.contents(preface + turn), config, purpose, chat.stage)
+        if config.search and reply.grounded:
+            self._share_facts(chat.topic, text, reply.sources, reply.text)
+        chat.history.extend([("user", turn, chat.stage), ("model", reply.text, chat.stage)])
+        chat.directive = ""
+        return reply.text
+
+    def stream(self, chat: ChatSession, text: str, purpose: str = "chat", stage: str = None):
+        """Streaming chat turn; yields text pieces and records the full reply when done."""
+        self._before_turn(chat, stage, purpose)
+        turn = self._user_turn(chat, text)
+        config, preface = self._grounding(chat, text)
+        parts, grounded, sources = [], False, []
+        for chunk in self._stream(chat.model, chat.contents(preface + turn), config, purpose, chat.stage):
+            grounded = grounded or chunk.grounded
+            sources.extend(chunk.sources)
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+        reply = "".join(parts)
+        if config.search and grounded:
+            self._share_facts(chat.topic, text, sources, reply)
+        chat.history.extend([("user", turn, chat.stage), ("model", reply, chat.stage)])
+        chat.directive = ""
+
+    # ---------- one-shot ----------
+    def generate(self, text: str, prompt=None, model: str = None, purpose: str = "generate", **config) -> str:
+        """Single request outside any chat; prompt is an optional SystemPrompt.
+
+        Model and generation settings come from the purpose's route (llm.routing);
+        explicit model/config arguments override them.
+        """
+        route = self.router.route(purpose)
+        cfg = GenerationConfig(system_instruction=prompt.text if prompt else "", **{**route.config, **config})
+        return self._generate(model or route.model, [("user", text)], cfg, purpose).text
+
+
+_gateway = None
+_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Process-wide gateway; the backend is picked by the LLM_BACKEND setting (default: genai)."""
+    global _gateway
+    with _lock:
+        if _gateway is None:
+            name = settings.get("LLM_BACKEND", "genai")
+            factory = BACKENDS.get(name)
+            if factory is None:
+                raise RuntimeError(f"Unknown LLM_BACKEND: {name!r} (known: {', '.join(BACKENDS)})")
+            backend = factory(settings.get("GEMINI_API_KEY"))
+            _gateway = LLMGateway(backend, context_cache.from_settings(backend), compaction.budget_from_settings(),
+                                  scheduler.from_settings(), routing.from_settings(), grounding.from_settings(),
+                                  resilience.from_settings())
+        return _gateway
+# === END FILE: llm/gateway.py ===
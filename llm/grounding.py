@@ -0,0 +1,158 @@
+# === BEGIN FILE: llm/grounding.py ===
+# Selective search grounding. A cheap local heuristic decides whether a chat turn
+# needs a factual science check; only those turns get the Google Search tool.
+# A grounded reply is written for one student's story, so it is never shared as is:
+# a background call extracts the general, story-free facts from its search-backed
+# passages, and those go into a process-wide TTL cache keyed by the normalized Key
+# Pieces concept + question. The next student on the same concept who asks the same
+# self-contained question gets the facts in the prompt instead of a repeat search.
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from llm import metrics, settings
+
+DEFAULT_TTL_S = 6 * 3600
+DEFAULT_SIZE = 512
+MAX_FACT_CHARS = 1200
+MIN_KEY_WORDS = 2  # content words a question needs before its answer is shared
+
+_WORD = re.compile(r"[a-z0-9']+")
+_NUMBER_UNIT = re.compile(r"\d+(\.\d+)?\s*(%|percent|degrees?|°|km|m|cm|mm|kg|g|mg|l|ml|years?|hours?|seconds?)\b", re.I)
+
+STOPWORDS = frozenset(
+    "a an the and or but of to in on at for with by from as is are was were be been it its this that "
+    "these those i you he she we they my your our their me do does did can could would should will "
+    "what why how when where which who whom about into than then so if not no yes".split()
+)
+QUESTION_WORDS = frozenset("what why how when where which who is are does do can could would should".split())
+FACT_CUES = frozenset(
+    "true real really actually accurate correct fact facts science scientific scientists evidence "
+    "explain explains work works happen happens cause causes effect made measure data percent "
+    "temperature energy speed distance possible realistic".split()
+)
+# "why ..." / "how does ..." / "how many ..." ask for an explanation or a number
+HOW_FACTUAL = frozenset("does do is are can much many long far fast big hot cold".split())
+# Questions that lean on earlier turns ("is that true?", "how does it work?") mean
+# something different in every conversation, so their answers are never shared.
+CONTEXT_WORDS = frozenset(
+    "it its this that these those they them their he she him his her there here above earlier "
+    "previous before same again mine my our your".split()
+)
+STORY_CUES = frozenset(
+    "character characters story plot name names scene scenes setting hero heroine villain chapter "
+    "dialogue twist ending beginning genre protagonist antagonist".split()
+)
+
+
+def _words(text: str) -> list:
+    return _WORD.findall((text or "").lower())
+
+
+def needs_search(text: str, topic: str = "") -> bool:
+    """True when a turn looks like a factual question (worth a search), not a story move."""
+    words = _words(text)
+    if not words:
+        return False
+    vocab = set(words)
+    explains = words[0] == "why" or (words[0] == "how" and len(words) > 1 and words[1] in HOW_FACTUAL)
+    factual = explains or bool(vocab & FACT_CUES) or bool(_NUMBER_UNIT.search(text))
+    asks = "?" in text or words[0] in QUESTION_WORDS
+    on_topic = bool(vocab & (set(_words(topic)) - STOPWORDS))
+    story = len(vocab & STORY_CUES)
+    return 2 * factual + asks + on_topic - 2 * story >= 2
+
+
+def normalize(text: str) -> str:
+    return " ".join(sorted({w for w in _words(text) if w not in STOPWORDS}))
+
+
+def cacheable(question: str, topic: str = "") -> bool:
+    """True for a self-contained question specific enough to share its facts across students.
+
+    Naming the concept counts as specific ("What is photosynthesis?"): the cache key is
+    scoped to the concept anyway. Otherwise MIN_KEY_WORDS content words are needed.
+    """
+    words = set(_words(question))
+    if words & CONTEXT_WORDS:
+        return False
+    specific = set(normalize(question).split()) - FACT_CUES - QUESTION_WORDS
+    if specific & set(normalize(topic).split()):
+        return True
+    return len(specific) >= MIN_KEY_WORDS
+
+
+EXTRACT_PROMPT = (
+    "Below is a student's question and search-backed passages from an answer written for that "
+    "student's own story. List the general science facts they state that answer the question, as "
+    "3–6 short standalone bullet points. Leave out anything about the student, their story, "
+    "characters, names, places or plans, and add nothing that is not in the passages. "
+    "If there are no such facts, reply with just NONE.\n\n"
+    "Question: {question}\n\nPassages:\n{passages}"
+)
+
+
+def extract_prompt(question: str, passages: str) -> str:
+    return EXTRACT_PROMPT.format(question=question.strip(), passages=passages.strip())
+
+
+def clean_facts(text: str) -> str:
+    """Extracted facts, or "" when the extraction found none."""
+    text = (text or "").strip()
+    return "" if not text or text.strip(".").upper() == "NONE" else text
+
+
+class FactCache:
+    """LRU of extracted grounded facts with a TTL, keyed by (normalized concept, normalized question)."""
+
+    def __init__(self, ttl_s: float = DEFAULT_TTL_S, max_entries: int = DEFAULT_SIZE):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._items = OrderedDict()  # key -> (expires_at, facts)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(topic: str, question: str) -> tuple:
+        return normalize(topic), normalize(question)
+
+    def get(self, topic: str, question: str) -> str:
+        key = self.key(topic, question)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return ""
+            if item[0] < time.monotonic():
+                del self._items[key]
+                metrics.incr("grounding.cache_expired")
+                return ""
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, topic: str, question: str, facts: str) -> None:
+        facts = (facts or "").strip()[:MAX_FACT_CHARS]
+        if not facts:
+            return
+        key = self.key(topic, question)
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_s, facts)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        metrics.incr("grounding.cache_store")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._items), "ttl_s": self.ttl_s}
+
+
+def facts_note(facts: str) -> str:
+    """Cached facts as a preface to the user turn (stands in for a repeat search)."""
+    return ("(Background for assistant: general facts from a web search made earlier on this concept. "
+            f"Use them if relevant; do not mention this note.)\n{facts}\n\n")
+
+
+def from_settings() -> FactCache:
+    return FactCache(ttl_s=settings.get_float("FACT_CACHE_TTL_S", DEFAULT_TTL_S),
+                     max_entries=settings.get_int("FACT_CACHE_SIZE", DEFAULT_SIZE))
+# === END FILE: llm/grounding.py ===
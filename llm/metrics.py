@@ -0,0 +1,29 @@
+# === BEGIN FILE: llm/metrics.py ===
+# Process-wide counters for the model layer (cache hits, fallbacks, call counts, ...).
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def incr(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] += n
+
+
+def get(name: str) -> int:
+    with _lock:
+        return _counters[name]
+
+
+def snapshot(prefix: str = "") -> dict:
+    """Copy of all counters (optionally only those starting with prefix)."""
+    with _lock:
+        return {k: v for k, v in sorted(_counters.items()) if k.startswith(prefix)}
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+# === END FILE: llm/metrics.py ===
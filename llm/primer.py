@@ -0,0 +1,59 @@
+# === BEGIN FILE: llm/primer.py ===
+# Concept primer: on Key Pieces submit, a background job writes a short per-brief
+# primer (accurate facts, misconceptions to avoid, age-appropriate vocabulary).
+# Jobs and results are shared by every session with the same normalized brief, and
+# the primer joins the system instruction once it is ready (see llm.resources).
+import hashlib
+import re
+
+from llm import metrics
+from llm.background import Speculator
+
+PRIMER_PROMPT = (
+    "Write a compact teacher primer for guiding a student at this level who is writing a story "
+    "built around this science concept.\n"
+    "Level: {level}\nConcept: {concept}\n\n"
+    "Sections, plain text, under 250 words in total:\n"
+    "FACTS: 5–7 short, accurate key facts at the right depth for the level.\n"
+    "MISCONCEPTIONS: 3–5 common misconceptions to gently steer away from.\n"
+    "VOCABULARY: 8–12 age-appropriate terms, each with a one-line definition."
+)
+
+_primers = Speculator(max_size=256)
+
+
+def _norm(value) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", str(value or "").lower()))
+
+
+def brief_key(form_data: dict) -> str:
+    """Facts, misconceptions and vocabulary depend on level + concept only, so that is the key."""
+    brief = f"{_norm(form_data.get('level'))}|{_norm(form_data.get('concept'))}"
+    return hashlib.sha256(brief.encode("utf-8")).hexdigest()[:16]
+
+
+def _generate(level: str, concept: str) -> str:
+    from llm.gateway import get_gateway  # gateway imports are heavy; keep this module light
+
+    text = PRIMER_PROMPT.format(level=level or "(unspecified)", concept=concept)
+    return get_gateway().generate(text, purpose="primer").strip()
+
+
+def prefetch(form_data: dict) -> None:
+    """Start the primer for this brief in the background unless it exists or is already running."""
+    concept = (form_data or {}).get("concept", "").strip()
+    if not concept:
+        return
+    key = brief_key(form_data)
+    if _primers.peek(key) is not None:
+        metrics.incr("primer.shared")
+        return
+    _primers.prefetch(key, key, _generate, form_data.get("level", "").strip(), concept)
+
+
+def ready(form_data: dict) -> str:
+    """The primer for this brief if it has finished, else "" (never waits)."""
+    if not (form_data or {}).get("concept", "").strip():
+        return ""
+    return _primers.peek(brief_key(form_data)) or ""
+# === END FILE: llm/primer.py ===
@@ -0,0 +1,271 @@
+# === BEGIN FILE: llm/resilience.py ===
+# Call policies that keep a slow or failing upstream from tying up server threads:
+# - a time-to-first-token deadline and an inter-chunk stall timeout for streams
+#   (one deadline for one-shot calls),
+# - an optional hedged second request once a call is slower than the recent
+#   latency percentile for its purpose (first answer wins),
+# - a per-model circuit breaker that fails fast while the upstream is degraded.
+# Backend iterators run on a small pump thread so the caller can stop waiting.
+import math
+import queue
+import threading
+import time
+from collections import deque
+
+from llm import metrics, settings
+
+DEFAULT_TTFT_S = 20.0
+DEFAULT_STALL_S = 15.0
+DEFAULT_CALL_S = 60.0
+DEFAULT_HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET_S = 30.0
+
+
+class StreamTimeout(TimeoutError):
+    """No first token before the deadline, or the stream stalled between chunks."""
+
+
+class CircuitOpen(RuntimeError):
+    """Upstream marked degraded; the call was refused without being sent."""
+
+
+def friendly_message(exc: BaseException) -> str:
+    """Student-facing text for policy failures, or "" for other errors."""
+    if isinstance(exc, CircuitOpen):
+        return ("InspiraBot can't reach its writing helper right now. Your message is saved — "
+                "please try again in a minute.")
+    if isinstance(exc, StreamTimeout):
+        return "That reply took too long, so I stopped waiting. Please send your message again."
+    return ""
+
+
+def counts_as_outage(exc: BaseException) -> bool:
+    """Errors that say the upstream is unhealthy (not that this request was bad).
+
+    Only timeouts, connection failures and HTTP 5xx count. Quota errors (429) don't:
+    llm.scheduler backs off and retries those. Neither do local bugs (a TypeError
+    building a request), which should surface as themselves, not as an outage card.
+    """
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    # httpx (under google-genai) raises its own TransportError family for network failures
+    if any(cls.__name__ == "TransportError" and cls.__module__.startswith("httpx") for cls in type(exc).__mro__):
+        return True
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return isinstance(code, int) and code >= 500
+
+
+class CircuitBreaker:
+    """Per-model: open after N consecutive outage errors, one probe call after reset_s."""
+
+    def __init__(self, failures: int = DEFAULT_BREAKER_FAILURES, reset_s: float = DEFAULT_BREAKER_RESET_S):
+        self.failures = failures
+        self.reset_s = reset_s
+        self._state = {}  # model -> [consecutive failures, opened_at or None, probe owner thread or 0]
+        self._lock = threading.Lock()
+
+    def check(self, model: str) -> None:
+        """Raise CircuitOpen unless a call to model may go ahead now."""
+        with self._lock:
+            st = self._state.setdefault(model, [0, None, 0])
+            if st[1] is None:
+                return
+            if time.monotonic() - st[1] >= self.reset_s and not st[2]:
+                st[2] = threading.get_ident()  # half-open: let one probe through
+                metrics.incr("resilience.breaker_probe")
+                return
+        metrics.incr("resilience.breaker_rejected")
+        raise CircuitOpen(f"{model} is temporarily unavailable (circuit open)")
+
+    def success(self, model: str) -> None:
+        with self._lock:
+            st = self._state.setdefault(model, [0, None, 0])
+            if st[1] is not None:
+                metrics.incr("resilience.breaker_closed")
+            st[:] = [0, None, 0]
+
+    def failure(self, model: str, exc: BaseException) -> None:
+        outage = counts_as_outage(exc)
+        with self._lock:
+            st = self._state.setdefault(model, [0, None, 0])
+            probe, st[2] = st[2], 0  # the probe is over whatever the error was
+            if not outage:
+                return
+            st[0] += 1
+            if probe or (st[1] is None and st[0] >= self.failures):
+                st[1] = time.monotonic()
+                metrics.incr("resilience.breaker_opened")
+
+    def release(self, model: str) -> None:
+        """Call finished or was abandoned: a probe started by this thread is no longer in flight."""
+        with self._lock:
+            st = self._state.get(model)
+            if st is not None and st[2] == threading.get_ident():
+                st[2] = 0
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {model: {"failures": st[0], "open": st[1] is not None,
+                            "open_s": round(now - st[1]) if st[1] is not None else 0}
+                    for model, st in self._state.items()}
+
+
+class _Pump(threading.Thread):
+    """Drains one backend iterator onto a shared queue as (pump id, kind, payload)."""
+
+    def __init__(self, pid: int, factory, out: queue.Queue, on_done=None):
+        super().__init__(name=f"llm-pump-{pid}", daemon=True)
+        self.pid, self.factory, self.out, self.on_done = pid, factory, out, on_done
+        self.cancelled = False
+        self.start()
+
+    def run(self):
+        try:
+            for item in self.factory():
+                if self.cancelled:  # caller gave up; stop reading, let the connection close
+                    return
+                self.out.put((self.pid, "item", item))
+        except BaseException as e:
+            self.out.put((self.pid, "error", e))
+        else:
+            self.out.put((self.pid, "end", None))
+        finally:
+            if self.on_done is not None:
+                self.on_done()
+
+
+def guarded_stream(factory, ttft_s: float, stall_s: float, hedge_after_s: float = 0, slots=None):
+    """Yield from factory() with a TTFT deadline and stall timeout; optionally hedge the first token.
+
+    slots (llm.scheduler.Scheduler) admits the hedge: it needs a free slot and a rate
+    token right away, held until its request ends, or it is skipped.
+    """
+    out = queue.Queue()
+    pumps = [_Pump(0, factory, out)]
+    t0 = time.monotonic()
+    winner, failed = None, 0
+    try:
+        while True:
+            now = time.monotonic()
+            hedge_pending = winner is None and hedge_after_s and len(pumps) == 1
+            if winner is not None:
+                wait = stall_s
+            elif hedge_pending:
+                wait = min(ttft_s, hedge_after_s) - (now - t0)
+            else:
+                wait = ttft_s - (now - t0)
+            try:
+                pid, kind, payload = out.get(timeout=max(0.0, wait))
+            except queue.Empty:
+                if hedge_pending and time.monotonic() - t0 < ttft_s:
+                    hedge_after_s = 0  # one attempt per call
+                    if slots is None or slots.try_acquire():
+                        pumps.append(_Pump(1, factory, out, on_done=slots.release if slots else None))
+                        metrics.incr("resilience.hedged")
+                    else:
+                        metrics.incr("resilience.hedge_denied")
+                    continue
+                metrics.incr("resilience.ttft_timeout" if winner is None else "resilience.stall_timeout")
+                raise StreamTimeout("no first token in time" if winner is None else "stream stalled")
+            if winner is not None and pid != winner:
+                continue
+            if kind == "error":
+                failed += 1
+                if winner is None and failed < len(pumps):
+                    continue  # the other request may still answer
+                raise payload
+            if winner is None:
+                winner = pid
+                for p in pumps:
+                    p.cancelled = p.pid != pid
+                if pid:
+                    metrics.incr("resilience.hedge_won")
+            if kind == "end":
+                return
+            yield payload
+    finally:
+        for p in pumps:
+            p.cancelled = True
+
+
+def guarded_call(fn, timeout_s: float, hedge_after_s: float = 0, slots=None):
+    """fn() with a deadline (and optional hedge); the abandoned call finishes on its own thread."""
+    for result in guarded_stream(lambda: (fn(),), timeout_s, timeout_s, hedge_after_s, slots):
+        return result
+
+
+class Policy:
+    """Deadlines + hedging + breaker, applied by the gateway around every backend call."""
+
+    def __init__(self, ttft_s: float = DEFAULT_TTFT_S, stall_s: float = DEFAULT_STALL_S,
+                 call_s: float = DEFAULT_CALL_S, hedge: bool = False,
+                 hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE, breaker: CircuitBreaker = None):
+        self.ttft_s, self.stall_s, self.call_s = ttft_s, stall_s, call_s
+        self.hedge, self.hedge_percentile = hedge, hedge_percentile
+        self.breaker = breaker or CircuitBreaker()
+        self._samples = {}  # (kind, purpose) -> recent first-result latencies (s)
+        self._lock = threading.Lock()
+
+    def _hedge_after(self, key) -> float:
+        if not self.hedge:
+            return 0
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return 0
+        return samples[min(len(samples) - 1, math.ceil(self.hedge_percentile * len(samples)) - 1)]
+
+    def _sample(self, key, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=HEDGE_WINDOW)).append(seconds)
+
+    def call(self, model: str, purpose: str, fn, slots=None):
+        key, t0 = ("call", purpose), time.monotonic()
+        try:
+            result = guarded_call(fn, self.call_s, self._hedge_after(key), slots)
+        except Exception as e:
+            if isinstance(e, StreamTimeout):
+                metrics.incr("resilience.call_timeout")
+            self.breaker.failure(model, e)
+            raise
+        else:
+            self._sample(key, time.monotonic() - t0)
+            self.breaker.success(model)
+            return result
+        finally:
+            self.breaker.release(model)
+
+    def stream(self, model: str, purpose: str, factory, slots=None):
+        key, t0, first = ("stream", purpose), time.monotonic(), True
+        try:
+            for chunk in guarded_stream(factory, self.ttft_s, self.stall_s, self._hedge_after(key), slots):
+                if first:
+                    first = False
+                    self._sample(key, time.monotonic() - t0)
+                yield chunk
+        except Exception as e:
+            self.breaker.failure(model, e)
+            raise
+        else:
+            self.breaker.success(model)
+        finally:
+            self.breaker.release(model)  # also runs when the caller abandons the stream (GeneratorExit)
+
+
+def from_settings() -> Policy:
+    return Policy(
+        ttft_s=settings.get_float("LLM_TTFT_TIMEOUT_S", DEFAULT_TTFT_S),
+        stall_s=settings.get_float("LLM_STALL_TIMEOUT_S", DEFAULT_STALL_S),
+        call_s=settings.get_float("LLM_CALL_TIMEOUT_S", DEFAULT_CALL_S),
+        hedge=str(settings.get("LLM_HEDGE", "0")).lower() in ("1", "true", "yes", "on"),
+        hedge_percentile=settings.get_float("LLM_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE),
+        breaker=CircuitBreaker(
+            failures=settings.get_int("LLM_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES),
+            reset_s=settings.get_float("LLM_BREAKER_RESET_S", DEFAULT_BREAKER_RESET_S),
+        ),
+    )
+# === END FILE: llm/resilience.py ===
@@ -0,0 +1,137 @@
+# === BEGIN FILE: llm/resources.py ===
+# Process-wide shared resources: Gemini client, rules.txt cache, prompt registry.
+# Shared by every session of one Streamlit server process, so guarded by locks
+# and never touches st.session_state.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from llm import settings
+
+RULES_PATH = "rules.txt"
+FALLBACK_RULES = "You are InspiraBot. Follow the rules provided by the instructor. Be helpful, friendly, and concise."
+MAX_PROMPTS = 256  # distinct assembled system instructions kept per process
+# Per-request HTTP timeout, a bit above llm.resilience's call deadline: a call the policy
+# has given up on still ends on its own instead of holding its pump thread on the socket.
+DEFAULT_HTTP_TIMEOUT_S = 75.0
+
+_lock = threading.Lock()
+
+
+# ---------- Pooled client ----------
+_clients = {}  # api_key -> genai.Client
+
+
+def get_client(api_key: str):
+    """One google.genai client per API key per process (shares its HTTP connection pool)."""
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            from google import genai
+            from google.genai import types
+            timeout_s = settings.get_float("LLM_HTTP_TIMEOUT_S", DEFAULT_HTTP_TIMEOUT_S)
+            client = genai.Client(api_key=api_key, http_options=types.HttpOptions(timeout=int(timeout_s * 1000)))
+            _clients[api_key] = client
+        return client
+
+
+# ---------- rules.txt cache (invalidated by mtime) ----------
+_rules = {"mtime": None, "text": FALLBACK_RULES, "version": 0}
+
+
+def _rules_mtime(path: str):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load_rules(path: str = RULES_PATH) -> str:
+    """Return rules.txt, re-reading it only when its mtime changes."""
+    mtime = _rules_mtime(path)
+    with _lock:
+        if mtime == _rules["mtime"]:
+            return _rules["text"]
+        text = FALLBACK_RULES
+        if mtime is not None:
+            try:
+                with open(path) as f:
+                    text = f.read()
+            except OSError:
+                pass
+        _rules.update(mtime=mtime, text=text, version=_rules["version"] + 1)
+        return text
+
+
+def rules_version(path: str = RULES_PATH) -> int:
+    """Monotonic counter bumped every time rules.txt is (re)loaded."""
+    load_rules(path)
+    return _rules["version"]
+
+
+# ---------- Prompt registry ----------
+@dataclass(frozen=True)
+class SystemPrompt:
+    text: str
+    digest: str         # sha256 of text
+    rules_version: int
+
+    @property
+    def version(self) -> str:
+        """Short, stable id for caches and logs."""
+        return f"r{self.rules_version}-{self.digest[:12]}"
+
+
+class PromptRegistry:
+    """Dedupe assembled system instructions across sessions (LRU, bounded)."""
+
+    def __init__(self, max_size: int = MAX_PROMPTS):
+        self._max = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, text: str, rules_version: int) -> SystemPrompt:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            prompt = self._items.get(digest)
+            if prompt is None:
+                prompt = SystemPrompt(text=text, digest=digest, rules_version=rules_version)
+                self._items[digest] = prompt
+                if len(self._items) > self._max:
+                    self._items.popitem(last=False)
+            else:
+                self._items.move_to_end(digest)
+            return prompt
+
+    def get(self, digest: str):
+        with self._lock:
+            return self._items.get(digest)
+
+
+registry = PromptRegistry()
+
+
+def build_form_context(form_data: dict) -> str:
+    """Turn saved Key Pieces into a compact context string for the assistant."""
+    lines = [
+        "Use this context to guide the student in writing the story. "
+        "Do not re-ask for this form and do not introduce yourself."
+    ]
+    for k, v in (form_data or {}).items():
+        lines.append(f"- {k}: {v if v else '(empty)'}")
+    lines.append("When the student opens Outline, acknowledge briefly and start helping.")
+    return "\n".join(lines)
+
+
+def system_prompt(form_data: dict = None, primer: str = "") -> SystemPrompt:
+    """Assemble rules (+ Key Pieces context and concept primer when given) and register the result."""
+    text = load_rules().strip()
+    if form_data:
+        text += "\n\n" + build_form_context(form_data)
+    if primer:
+        text += ("\n\nConcept primer for this brief (keep the science accurate; "
+                 "do not paste it to the student):\n" + primer.strip())
+    return registry.register(text, rules_version())
+# === END FILE: llm/resources.py ===
@@ -0,0 +1,121 @@
+# === BEGIN FILE: llm/routing.py ===
+# Task-based model routing: each call purpose maps to a model + generation profile,
+# a latency SLO and a fallback model. Short deterministic tasks (reframes, summaries)
+# go to a lighter model with a small output cap, no tools and no thinking (thinking tokens
+# count against the cap, so a thinking fallback model could return nothing); chat keeps
+# the main model.
+# A route whose recent p95 latency breaks its SLO is served by its fallback for a while.
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from llm import metrics, settings
+
+CHAT_MODEL = "gemini-2.5-flash"
+LIGHT_MODEL = "gemini-2.5-flash-lite"
+
+WINDOW = 20          # recent latencies kept per route
+MIN_SAMPLES = 5      # before the SLO is judged
+COOLDOWN_S = 60.0    # how long a degraded route stays on its fallback
+
+
+@dataclass(frozen=True)
+class Route:
+    model: str
+    config: dict = field(default_factory=dict)  # GenerationConfig fields
+    slo_ms: int = 0                              # p95 target (TTFT for streams), queue wait excluded; 0 = none
+    fallback: str = ""                           # model used when degraded or on error
+
+
+def default_routes(chat_model: str = CHAT_MODEL, light_model: str = LIGHT_MODEL) -> dict:
+    return {
+        # Interactive nudges (directives ride along); search is allowed, llm.grounding picks the turns
+        "chat": Route(chat_model, dict(temperature=1.0, top_p=1, top_k=1, max_output_tokens=2048, search=True),
+                      slo_ms=4000, fallback=light_model),
+        # 2–4 line Outline reframes
+        "consolidate": Route(light_model, dict(temperature=0.3, max_output_tokens=160, thinking_budget=0),
+                             slo_ms=2500, fallback=chat_model),
+        # History summaries (llm.compaction)
+        "compaction": Route(light_model, dict(temperature=0.2, max_output_tokens=256, thinking_budget=0),
+                            slo_ms=4000, fallback=chat_model),
+        # Per-brief concept primer (llm.primer): one grounded call shared by a whole class
+        "primer": Route(light_model, dict(temperature=0.3, max_output_tokens=512, thinking_budget=0, search=True),
+                        slo_ms=10000, fallback=chat_model),
+        # Story-free facts pulled from a grounded chat reply (llm.grounding), shared via the fact cache
+        "facts": Route(light_model, dict(temperature=0.0, max_output_tokens=256, thinking_budget=0),
+                       slo_ms=4000, fallback=chat_model),
+        # Anything else
+        "generate": Route(chat_model, dict(max_output_tokens=1024), fallback=light_model),
+    }
+
+
+class _Health:
+    __slots__ = ("latencies", "degraded_until")
+
+    def __init__(self):
+        self.latencies = deque(maxlen=WINDOW)
+        self.degraded_until = 0.0
+
+
+class Router:
+    def __init__(self, routes: dict = None):
+        self.routes = routes or default_routes()
+        self._health = {name: _Health() for name in self.routes}
+        self._lock = threading.Lock()
+
+    def route(self, purpose: str) -> Route:
+        return self.routes.get(purpose) or self.routes["generate"]
+
+    def register(self, purpose: str, route: Route) -> None:
+        with self._lock:
+            self.routes[purpose] = route
+            self._health[purpose] = _Health()
+
+    def model_for(self, purpose: str, model: str = None) -> str:
+        """Model to call now: the route's (or the given) model, or the fallback while degraded."""
+        route = self.route(purpose)
+        model = model or route.model
+        health = self._health.get(purpose)
+        if health and route.fallback and time.monotonic() < health.degraded_until:
+            metrics.incr(f"routing.{purpose}.degraded_calls")
+            return route.fallback
+        return model
+
+    def fallback_for(self, purpose: str, model: str) -> str:
+        """Model to retry on after `model` failed, or "" when there is none."""
+        fallback = self.route(purpose).fallback
+        return fallback if fallback and fallback != model else ""
+
+    def observe(self, purpose: str, model: str, latency_ms: float) -> None:
+        """Record a successful call's latency; trips the route onto its fallback on an SLO breach."""
+        route, health = self.route(purpose), self._health.get(purpose)
+        if health is None or not route.slo_ms or model == route.fallback:
+            return
+        if latency_ms > route.slo_ms:
+            metrics.incr(f"routing.{purpose}.slo_miss")
+        with self._lock:
+            health.latencies.append(latency_ms)
+            if len(health.latencies) < MIN_SAMPLES or time.monotonic() < health.degraded_until:
+                return
+            ordered = sorted(health.latencies)
+            p95 = ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+            if p95 > route.slo_ms and route.fallback:
+                health.degraded_until = time.monotonic() + COOLDOWN_S
+                health.latencies.clear()
+                metrics.incr(f"routing.{purpose}.degraded")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {"model": r.model, "slo_ms": r.slo_ms, "fallback": r.fallback,
+                       "degraded_s": max(0, round(self._health[name].degraded_until - now))}
+                for name, r in self.routes.items()
+            }
+
+
+def from_settings() -> Router:
+    return Router(default_routes(settings.get("CHAT_MODEL", CHAT_MODEL), settings.get("LIGHT_MODEL", LIGHT_MODEL)))
+# === END FILE: llm/routing.py ===
@@ -0,0 +1,204 @@
+# === BEGIN FILE: llm/scheduler.py ===
+# Process-wide admission control for model calls: a concurrency cap, a token-bucket rate
+# limit, strict priority (interactive streaming before background work) with round-robin
+# fairness between sessions inside each priority, and jittered exponential backoff on
+# quota (429 / RESOURCE_EXHAUSTED) errors.
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+from llm import metrics, settings
+
+INTERACTIVE = 0  # student is watching: streamed chat turns
+BACKGROUND = 1   # nobody is waiting on screen: reframes, summaries, primers, ...
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE_PER_S = 10.0
+DEFAULT_BURST = 20
+DEFAULT_RETRIES = 4
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 8.0
+WAIT_SAMPLES = 2000
+
+
+def priority_for(purpose: str) -> int:
+    return INTERACTIVE if purpose == "chat" else BACKGROUND
+
+
+def is_quota_error(exc: BaseException) -> bool:
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    text = str(exc)
+    return code == 429 or "429" in text[:8] or "RESOURCE_EXHAUSTED" in text
+
+
+class TokenBucket:
+    def __init__(self, rate_per_s: float, burst: int):
+        self.rate = max(rate_per_s, 1e-6)
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.stamp = time.monotonic()
+
+    def take(self) -> float:
+        """Consume a token and return 0, or return seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _Waiter:
+    __slots__ = ("admitted", "enqueued")
+
+    def __init__(self):
+        self.admitted = False
+        self.enqueued = time.monotonic()
+
+
+class Scheduler:
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, rate_per_s: float = DEFAULT_RATE_PER_S,
+                 burst: int = DEFAULT_BURST, retries: int = DEFAULT_RETRIES):
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self._bucket = TokenBucket(rate_per_s, burst)
+        self._cond = threading.Condition()
+        self._queues = {INTERACTIVE: OrderedDict(), BACKGROUND: OrderedDict()}  # session -> deque[_Waiter]
+        self._inflight = 0
+        self._depth = 0
+        self._peak_depth = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)  # ms
+
+    # ---------- admission ----------
+    def _next_waiter(self):
+        for prio in (INTERACTIVE, BACKGROUND):
+            q = self._queues[prio]
+            if q:
+                session, waiters = next(iter(q.items()))
+                w = waiters.popleft()
+                del q[session]
+                if waiters:
+                    q[session] = waiters  # back of the line: round-robin between sessions
+                return w
+        return None
+
+    def _dispatch(self) -> float:
+        """Admit as many waiters as limits allow; returns how long to sleep if rate-limited."""
+        while self._inflight < self.concurrency and self._depth:
+            delay = self._bucket.take()
+            if delay:
+                return delay
+            w = self._next_waiter()
+            w.admitted = True
+            self._depth -= 1
+            self._inflight += 1
+            self._waits.append((time.monotonic() - w.enqueued) * 1000)
+            self._cond.notify_all()
+        return 0.05
+
+    def acquire(self, session: str = "", priority: int = BACKGROUND) -> float:
+        """Block until this call may run; returns the time spent queued (ms)."""
+        w = _Waiter()
+        with self._cond:
+            self._queues[priority].setdefault(session, deque()).append(w)
+            self._depth += 1
+            self._peak_depth = max(self._peak_depth, self._depth)
+            while not w.admitted:
+                delay = self._dispatch()
+                if not w.admitted:
+                    self._cond.wait(timeout=delay)
+        metrics.incr("scheduler.admitted")
+        return (time.monotonic() - w.enqueued) * 1000
+
+    def try_acquire(self) -> bool:
+        """Take a slot and a rate token now if both are free and nobody is queued; never waits.
+
+        For extra requests (hedges): they are skipped rather than queued or sent over the limits.
+        """
+        with self._cond:
+            if self._depth or self._inflight >= self.concurrency or self._bucket.take():
+                return False
+            self._inflight += 1
+        metrics.incr("scheduler.admitted_now")
+        return True
+
+    def release(self) -> None:
+        with self._cond:
+            self._inflight -= 1
+            self._dispatch()
+            self._cond.notify_all()
+
+    # ---------- calls ----------
+    def _backoff(self, attempt: int) -> None:
+        metrics.incr("scheduler.retries")
+        time.sleep(random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** attempt)))  # full jitter
+
+    def run(self, fn, session: str = "", priority: int = BACKGROUND, on_wait=None):
+        """fn() under a slot, retried with jittered backoff on quota errors."""
+        for attempt in range(self.retries + 1):
+            waited = self.acquire(session, priority)
+            if on_wait:
+                on_wait(waited)
+            try:
+                return fn()
+            except Exception as e:
+                if not is_quota_error(e) or attempt == self.retries:
+                    if is_quota_error(e):
+                        metrics.incr("scheduler.gave_up")
+                    raise
+                metrics.incr("scheduler.quota_errors")
+            finally:
+                self.release()
+            self._backoff(attempt)
+
+    def stream(self, factory, session: str = "", priority: int = INTERACTIVE, on_wait=None):
+        """Iterate factory() under a slot held for the whole stream.
+
+        Quota errors are retried only before the first chunk (a partial reply can't be replayed).
+        """
+        for attempt in range(self.retries + 1):
+            waited = self.acquire(session, priority)
+            if on_wait:
+                on_wait(waited)
+            started = False
+            try:
+                for chunk in factory():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started or not is_quota_error(e) or attempt == self.retries:
+                    if is_quota_error(e):
+                        metrics.incr("scheduler.gave_up")
+                    raise
+                metrics.incr("scheduler.quota_errors")
+            finally:
+                self.release()
+            self._backoff(attempt)
+
+    # ---------- metrics ----------
+    def stats(self) -> dict:
+        with self._cond:
+            waits = sorted(self._waits)
+            out = {
+                "inflight": self._inflight,
+                "queue_depth": self._depth,
+                "peak_queue_depth": self._peak_depth,
+                "queued_interactive": sum(len(d) for d in self._queues[INTERACTIVE].values()),
+                "queued_background": sum(len(d) for d in self._queues[BACKGROUND].values()),
+            }
+        for q in (0.5, 0.95, 0.99):
+            out[f"wait_p{int(q * 100)}_ms"] = round(waits[min(len(waits) - 1, int(q * (len(waits) - 1)))], 1) if waits else None
+        return out
+
+
+def from_settings() -> Scheduler:
+    return Scheduler(
+        concurrency=settings.get_int("LLM_MAX_CONCURRENCY", DEFAULT_CONCURRENCY),
+        rate_per_s=settings.get_float("LLM_RATE_PER_S", DEFAULT_RATE_PER_S),
+        burst=settings.get_int("LLM_BURST", DEFAULT_BURST),
+        retries=settings.get_int("LLM_MAX_RETRIES", DEFAULT_RETRIES),
+    )
+# === END FILE: llm/scheduler.py ===
@@ -0,0 +1,29 @@
+# === BEGIN FILE: llm/settings.py ===
+# Deployment knobs: st.secrets first (as the app always did), then environment variables.
+import os
+import streamlit as st
+
+
+def get(name: str, default=None):
+    """Look up a setting in st.secrets, then os.environ, else default."""
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except Exception:
+        pass  # no secrets.toml (local runs, load tests, background threads)
+    return os.environ.get(name, default)
+
+
+def get_float(name: str, default: float) -> float:
+    try:
+        return float(get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_int(name: str, default: int) -> int:
+    try:
+        return int(get(name, default))
+    except (TypeError, ValueError):
+        return default
+# === END FILE: llm/settings.py ===
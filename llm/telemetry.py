@@ -0,0 +1,191 @@
+# === BEGIN FILE: llm/telemetry.py ===
+# Per-call telemetry for every model call: latency, time-to-first-token, chunks, tokens,
+# grounding and errors, tagged by tab/stage/purpose. Records go to a rotating JSONL file
+# and to an in-process aggregator (p50/p95/p99) read by the sidebar admin panel.
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+
+from llm import settings
+
+DEFAULT_PATH = os.path.join("logs", "llm_calls.jsonl")
+MAX_BYTES = 5 * 1024 * 1024
+BACKUPS = 5
+SAMPLES = 2000  # latency samples kept per purpose for percentiles
+
+# tab / stage / session of the code currently running (copied into background jobs)
+_tags = contextvars.ContextVar("llm_tags", default={})
+
+
+@contextlib.contextmanager
+def tags(**values):
+    """Tag every call made inside this block, e.g. tags(tab="💭 Outline", stage="scenario")."""
+    token = _tags.set({**_tags.get(), **{k: v for k, v in values.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def current_tags() -> dict:
+    return _tags.get()
+
+
+@dataclass
+class CallRecord:
+    purpose: str            # chat | consolidate | compaction | session_create | ...
+    model: str = ""
+    kind: str = "generate"  # generate | stream | session
+    tab: str = ""
+    stage: str = ""
+    session: str = ""
+    ts: float = field(default_factory=time.time)
+    queue_ms: float = 0.0  # time spent waiting in llm.scheduler (summed over retries)
+    ttft_ms: float = None
+    latency_ms: float = None
+    chunks: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    grounded: bool = False
+    prefix_cached: bool = False
+    error: str = ""
+
+
+class Span:
+    """Times one call; finish() hands the record to the recorder."""
+
+    def __init__(self, purpose: str, model: str = "", kind: str = "generate", stage: str = None):
+        t = _tags.get()
+        self.rec = CallRecord(purpose=purpose, model=model, kind=kind, tab=t.get("tab", ""),
+                              stage=stage or t.get("stage", ""), session=t.get("session", ""))
+        self._t0 = time.perf_counter()
+        self._done = False
+
+    def chunk(self, chunk=None) -> None:
+        """Call once per received chunk (or once for a whole reply)."""
+        if self.rec.ttft_ms is None:
+            self.rec.ttft_ms = (time.perf_counter() - self._t0) * 1000
+        self.rec.chunks += 1
+        if chunk is not None:
+            self.usage(chunk)
+
+    def usage(self, chunk) -> None:
+        usage = getattr(chunk, "usage", None)
+        if usage:  # streaming replies report cumulative usage; keep the latest
+            self.rec.input_tokens = usage.get("input", 0)
+            self.rec.output_tokens = usage.get("output", 0)
+            self.rec.cached_tokens = usage.get("cached", 0)
+        self.rec.grounded = self.rec.grounded or bool(getattr(chunk, "grounded", False))
+
+    def queued(self, ms: float) -> None:
+        self.rec.queue_ms += ms
+
+    def fail(self, exc: BaseException) -> None:
+        self.rec.error = f"{type(exc).__name__}: {exc}"[:300]
+
+    def finish(self) -> CallRecord:
+        if not self._done:
+            self._done = True
+            self.rec.latency_ms = (time.perf_counter() - self._t0) * 1000
+            recorder().record(self.rec)
+        return self.rec
+
+
+def _percentile(sorted_vals, q: float):
+    if not sorted_vals:
+        return None
+    i = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[i]
+
+
+class Aggregator:
+    """Rolling per-purpose latency/TTFT samples plus running totals."""
+
+    def __init__(self, samples: int = SAMPLES):
+        self._n = samples
+        self._lock = threading.Lock()
+        self._rows = {}
+
+    def add(self, rec: CallRecord) -> None:
+        with self._lock:
+            row = self._rows.get(rec.purpose)
+            if row is None:
+                row = self._rows[rec.purpose] = {
+                    "calls": 0, "errors": 0, "grounded": 0, "chunks": 0,
+                    "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0,
+                    "latency": deque(maxlen=self._n), "ttft": deque(maxlen=self._n),
+                }
+            row["calls"] += 1
+            row["errors"] += bool(rec.error)
+            row["grounded"] += rec.grounded
+            row["chunks"] += rec.chunks
+            row["input_tokens"] += rec.input_tokens
+            row["output_tokens"] += rec.output_tokens
+            row["cached_tokens"] += rec.cached_tokens
+            row["latency"].append(rec.latency_ms)
+            if rec.ttft_ms is not None:
+                row["ttft"].append(rec.ttft_ms)
+
+    def summary(self) -> list:
+        """One dict per purpose with counts, token totals and p50/p95/p99 (ms)."""
+        with self._lock:
+            rows = {k: dict(v, latency=sorted(v["latency"]), ttft=sorted(v["ttft"])) for k, v in self._rows.items()}
+        out = []
+        for purpose, row in sorted(rows.items()):
+            item = {"purpose": purpose}
+            item.update({k: v for k, v in row.items() if k not in ("latency", "ttft")})
+            for name in ("latency", "ttft"):
+                for q in (0.5, 0.95, 0.99):
+                    val = _percentile(row[name], q)
+                    item[f"{name}_p{int(q * 100)}"] = round(val, 1) if val is not None else None
+            out.append(item)
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rows.clear()
+
+
+class Recorder:
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.aggregator = Aggregator()
+        self._log = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(path, maxBytes=MAX_BYTES, backupCount=BACKUPS,
+                                                               encoding="utf-8", delay=True)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self._log = logging.getLogger("inspirabot.telemetry")
+                self._log.handlers[:] = [handler]
+                self._log.setLevel(logging.INFO)
+                self._log.propagate = False
+            except OSError:
+                self._log = None  # read-only filesystem: aggregator only
+
+    def record(self, rec: CallRecord) -> None:
+        self.aggregator.add(rec)
+        if self._log is not None:
+            self._log.info(json.dumps(asdict(rec), ensure_ascii=False))
+
+
+_recorder = None
+_lock = threading.Lock()
+
+
+def recorder() -> Recorder:
+    """Process-wide recorder; TELEMETRY_PATH="" keeps records in memory only."""
+    global _recorder
+    with _lock:
+        if _recorder is None:
+            _recorder = Recorder(settings.get("TELEMETRY_PATH", DEFAULT_PATH))
+        return _recorder
+# === END FILE: llm/telemetry.py ===
@@ -0,0 +1,58 @@
+# === BEGIN FILE: ui/admin.py ===
+import streamlit as st
+from llm import metrics, settings, telemetry
+from llm.gateway import get_gateway
+from ui import memory
+
+REFRESH_S = 5
+
+
+def is_admin() -> bool:
+    """Admin view is opt-in: ADMIN_TOKEN must be set and passed as ?admin=<token>."""
+    token = settings.get("ADMIN_TOKEN")
+    return bool(token) and st.query_params.get("admin") == str(token)
+
+
+@st.fragment(run_every=REFRESH_S)
+def _live_panel():
+    rows = telemetry.recorder().aggregator.summary()
+    if not rows:
+        st.caption("No model calls yet.")
+    else:
+        st.markdown("**Latency (ms)**")
+        st.dataframe(
+            [{k: r[k] for k in ("purpose", "calls", "errors", "ttft_p50", "ttft_p95", "ttft_p99",
+                                 "latency_p50", "latency_p95", "latency_p99")} for r in rows],
+            hide_index=True,
+        )
+        st.markdown("**Tokens & grounding**")
+        st.dataframe(
+            [{k: r[k] for k in ("purpose", "input_tokens", "output_tokens", "cached_tokens", "chunks", "grounded")}
+             for r in rows],
+            hide_index=True,
+        )
+    st.markdown("**Scheduler**")
+    st.json(get_gateway().scheduler.stats(), expanded=False)
+    st.markdown("**Routes**")
+    st.dataframe([{"purpose": k, **v} for k, v in get_gateway().router.stats().items()], hide_index=True)
+    st.caption(f"Fact cache: {get_gateway().facts.stats()['entries']} shared fact sets")
+    breakers = get_gateway().policy.breaker.stats()
+    if breakers:
+        st.markdown("**Circuit breakers**")
+        st.dataframe([{"model": k, **v} for k, v in breakers.items()], hide_index=True)
+    sessions = memory.report()
+    if sessions:
+        st.markdown(f"**Session memory** ({sum(r['kb'] for r in sessions):,.0f} KB in {len(sessions)} sessions)")
+        st.dataframe(sessions, hide_index=True)
+    with st.expander("Counters"):
+        st.json(metrics.snapshot())
+
+
+def render_admin_panel():
+    """Sidebar telemetry view (live p50/p95/p99 per call purpose), refreshed every few seconds."""
+    if not is_admin():
+        return
+    st.divider()
+    st.subheader("📈 LLM telemetry")
+    _live_panel()
+# === END FILE: ui/admin.py ===
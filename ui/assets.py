@@ -0,0 +1,117 @@
+# === BEGIN FILE: ui/assets.py ===
+# Static assets: images are pre-resized once (WebP + PNG fallback) into ./static and
+# served by Streamlit's static file serving (.streamlit/config.toml) as a plain <img>,
+# so a rerun sends a URL instead of re-encoding a 1.8 MB PNG. Without static serving
+# the WebP bytes are cached per process and handed to st.image. CSS is read once per
+# process from assets/app.css.
+#
+#   python -m ui.assets    # build all variants ahead of deployment
+import logging
+import os
+import threading
+
+import streamlit as st
+
+ASSETS_DIR = "assets"
+STATIC_DIR = "static"        # served at app/static/ when server.enableStaticServing is on
+STATIC_URL = "app/static"
+
+BANNER = ("banner.png", 1600)   # (source in assets/, width in px)
+AVATAR = ("Avatar.png", 128)
+VARIANTS = (BANNER + ("webp",), BANNER + ("png",), AVATAR + ("png",))
+
+log = logging.getLogger("inspirabot.assets")
+_cache = {}  # memo: variant paths, bytes, html, css
+_lock = threading.Lock()
+
+
+def _variant_name(source: str, width: int, fmt: str) -> str:
+    stem = os.path.splitext(source)[0]
+    return f"{stem}-{width}.{fmt}"
+
+
+def build(source: str, width: int, fmt: str) -> str:
+    """Path of the resized variant in static/, (re)built if missing or older than the source."""
+    src = os.path.join(ASSETS_DIR, source)
+    out = os.path.join(STATIC_DIR, _variant_name(source, width, fmt))
+    try:
+        if os.path.exists(out) and os.stat(out).st_mtime >= os.stat(src).st_mtime:
+            return out
+    except OSError:
+        return out if os.path.exists(out) else src
+    from PIL import Image  # only needed when a variant has to be (re)built
+
+    try:
+        with Image.open(src) as im:
+            if im.width > width:
+                im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+            os.makedirs(STATIC_DIR, exist_ok=True)
+            tmp = out + ".tmp"
+            if fmt == "webp":
+                im.save(tmp, "WEBP", quality=82, method=6)
+            else:  # fallback for browsers without WebP: 256-colour palette keeps it small
+                im.convert("RGBA").quantize(256, method=Image.FASTOCTREE).save(tmp, "PNG", optimize=True)
+        os.replace(tmp, out)
+    except OSError as e:  # read-only checkout etc.: keep whatever exists
+        log.warning("could not build %s: %s", out, e)
+        return out if os.path.exists(out) else src
+    return out
+
+
+def _memo(key, make):
+    with _lock:
+        if key not in _cache:
+            _cache[key] = make()
+        return _cache[key]
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _static_serving() -> bool:
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+def _banner_html() -> str:
+    webp = os.path.basename(build(*BANNER, "webp"))
+    png = os.path.basename(build(*BANNER, "png"))
+    return (
+        "<picture>"
+        f"<source srcset='{STATIC_URL}/{webp}' type='image/webp'>"
+        f"<img src='{STATIC_URL}/{png}' alt='InspiraBot' style='width:100%;height:auto;'>"
+        "</picture>"
+    )
+
+
+def banner() -> None:
+    """Header image: a static URL when static serving is on, else cached WebP bytes."""
+    if _static_serving() and _memo("banner_static", lambda: build(*BANNER, "webp").startswith(STATIC_DIR)):
+        st.markdown(_memo("banner_html", _banner_html), unsafe_allow_html=True)
+    else:
+        st.image(_memo("banner_bytes", lambda: _read(build(*BANNER, "webp"))), width="stretch")
+
+
+def avatar_path() -> str:
+    """Small assistant avatar for chat bubbles (the original is 570 KB)."""
+    return _memo("avatar", lambda: build(*AVATAR, "png"))
+
+
+def inject_css() -> None:
+    """App-wide styles in one style-only block (st.html puts it outside the layout)."""
+    st.html(_memo("css", lambda: f"<style>{_read(os.path.join(ASSETS_DIR, 'app.css')).decode('utf-8')}</style>"))
+
+
+def main() -> None:
+    for source, width, fmt in VARIANTS:
+        path = build(source, width, fmt)
+        print(f"{path}: {os.path.getsize(path):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
+# === END FILE: ui/assets.py ===
@@ -1,38 +1,18 @@
 # === BEGIN FILE: ui/common.py ===
+import uuid
+
 import streamlit as st
+from core import validation
+from core.transcript import Transcript
+from llm import metrics, primer, resilience, resources, telemetry
+from llm.gateway import get_gateway
+from ui import assets, memory, persistence
+from ui.router import active_tab
+from ui.streaming import StreamRenderer
 
 def looks_gibberish(s: str) -> bool:
-    """Very light guard for empty / random-like inputs."""
-    s = (s or "").strip()
-    if not s:
-        return True
-    lower = s.lower()
-    letters_only = "".join(c for c in lower if c.isalpha())
-
-    if len(set(lower)) <= 3 and len(lower) >= 6:
-        return True
-    if " " not in s and len(letters_only) >= 6 and not any(v in letters_only for v in "aeiou"):
-        return True
-    if " " not in s and len(letters_only) >= 10 and len(set(letters_only)) <= 4:
-        return True
-
-    nonspace = sum(1 for c in s if not c.isspace())
-    letters = sum(c.isalpha() for c in s)
-    if nonspace > 0 and (letters / nonspace) < 0.5:
-        return True
-    return False
-
-
-def build_form_context(form_data: dict) -> str:
-    """Turn saved Key Pieces into a compact context string for the assistant."""
-    lines = [
-        "Use this context to guide the student in writing the story. "
-        "Do not re-ask for this form and do not introduce yourself."
-    ]
-    for k, v in (form_data or {}).items():
-        lines.append(f"- {k}: {v if v else '(empty)'}")
-    lines.append("When the student opens Outline, acknowledge briefly and start helping.")
-    return "\n".join(lines)
+    """Very light guard for empty / random-like inputs (single pass, see core.validation)."""
+    return validation.analyze(s).gibberish
 
 
 def lock_card(msg: str) -> None:
@@ -40,6 +20,186 @@ def lock_card(msg: str) -> None:
     st.warning(msg)
 
 
+USER_AVATAR = "👩🏼‍💻"
+HISTORY_WINDOW = 20     # messages of the current stage shown before "Load earlier"
+RENDER_CACHE_SLACK = 4  # render cache is pruned back to the visible set past window × this
+
+
+def _avatar(role: str) -> str:
+    if role == "user":
+        return USER_AVATAR
+    return st.session_state.get("assistant_avatar") or assets.avatar_path()
+
+
+def session_id() -> str:
+    """Random id for this browser session (telemetry tags, background job slots)."""
+    return st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+
+def chat_transcript() -> Transcript:
+    """The session's Transcript (created on first use)."""
+    ss = st.session_state
+    if not isinstance(ss.get("chat_history"), Transcript):
+        ss["chat_history"] = Transcript()
+        persistence.attach_store(ss["chat_history"])
+    return ss["chat_history"]
+
+
+def _load_saved(n: int) -> None:
+    """Button callback: page in older stored messages.
+
+    Looks the transcript up at click time (never bound to it) and touches first:
+    callbacks run before the script, possibly right after an idle spill.
+    """
+    memory.touch(session_id())
+    chat_transcript().load_earlier(n)
+
+
+def _message_view(msg) -> tuple:
+    """(role, avatar, body) for a message, computed once per message id."""
+    cache = st.session_state.setdefault("chat_render_cache", {})
+    view = cache.get(msg.id)
+    if view is None:
+        body = msg.text.strip() or "_No response text received._"
+        view = cache[msg.id] = (msg.role, _avatar(msg.role), body)
+    return view
+
+
+def _render_message(msg) -> None:
+    role, avatar, body = _message_view(msg)
+    with st.chat_message(role, avatar=avatar):
+        st.markdown(body)
+
+
+def _segment_key(seg) -> str:
+    """Stable id for an earlier segment: its stage + last message id.
+
+    Positions shift when older messages are paged in or trimmed; the last message of a
+    finished segment does not (paging only prepends, trimming only drops from the front).
+    """
+    return f"{seg.stage}:{seg.messages[-1].id}"
+
+
+def _render_history(transcript: Transcript, stage: str, input_key: str) -> None:
+    """Collapsed earlier stages, then the last N messages of the current stage with paging."""
+    ss = st.session_state
+    window_key, expanded_key, view_key = f"{input_key}_window", f"{input_key}_expanded", f"{input_key}_view"
+    if ss.get(view_key) != stage or not len(transcript):  # new stage or cleared chat: start collapsed
+        ss[view_key] = stage
+        ss[window_key] = HISTORY_WINDOW
+        ss[expanded_key] = set()
+    window = ss[window_key]
+    expanded = ss[expanded_key]  # keys of opened earlier segments, see _segment_key
+
+    # Messages from a resumed session that are still only in the session store
+    if transcript.unloaded:
+        st.button(f"📂 Load earlier messages from your saved session ({transcript.unloaded} more)",
+                  key=f"{input_key}_saved", on_click=_load_saved, args=(HISTORY_WINDOW,))
+
+    segments = transcript.segments
+    current = segments[-1] if segments and segments[-1].stage == stage else None
+    older = segments[:-1] if current is not None else segments
+
+    # Earlier stages: one collapsed row each unless the student opens it
+    for seg in older:
+        key = _segment_key(seg)
+        if key in expanded:
+            for msg in seg.messages:
+                _render_message(msg)
+        else:
+            label = seg.stage.title() or "Earlier"
+            st.button(f"🗂️ {label} — show {len(seg)} earlier messages", key=f"{input_key}_open_{key}",
+                      on_click=expanded.add, args=(key,))
+
+    # Current stage: windowed
+    if current is None:
+        return
+    hidden = max(0, len(current) - window)
+    if hidden:
+        st.button(f"⬆️ Load earlier messages ({hidden} more)", key=f"{input_key}_more",
+                  on_click=ss.__setitem__, args=(window_key, window + HISTORY_WINDOW))
+    visible = current.messages[hidden:]
+    for msg in visible:
+        _render_message(msg)
+
+    cache = ss.get("chat_render_cache", {})
+    if len(cache) > RENDER_CACHE_SLACK * max(window, HISTORY_WINDOW):
+        keep = {m.id for m in visible}
+        ss["chat_render_cache"] = {k: v for k, v in cache.items() if k in keep}
+
+
+def _apply_primer(chat) -> None:
+    """Move the chat onto the brief's system prompt + concept primer once the primer is ready."""
+    ss = st.session_state
+    if not ss.get("form_valid"):
+        return
+    text = primer.ready(ss.get("form_data"))
+    if not text:
+        return
+    prompt = resources.system_prompt(ss["form_data"], primer=text)
+    if chat.prompt_version != prompt.version:
+        ss["system_prompt"] = prompt
+        get_gateway().set_prompt(chat, prompt)
+        metrics.incr("primer.applied")
+
+
+@st.fragment
+def render_chat_area(input_key: str, stage: str = "", on_user_message=None) -> None:
+    """Replay message bubbles, then show chat input at the bottom (natural chat layout).
+
+    Runs as a fragment: submitting a message or streaming the reply reruns only
+    this region, not the banner, sidebar, Gemini setup or the rest of the tab.
+    Only the latest messages of `stage` are drawn; earlier stages stay collapsed.
+    on_user_message(text) is called right after a message is saved, before the reply streams.
+    """
+    memory.touch(session_id())  # fragment reruns skip app.py's touch
+    # Fragment reruns skip the router, so tag model calls here too
+    with telemetry.tags(tab=active_tab(), stage=stage, session=session_id()):
+        _chat_area(input_key, stage, on_user_message)
+
+
+def _chat_area(input_key: str, stage: str, on_user_message) -> None:
+    ss = st.session_state
+    transcript = chat_transcript()
+
+    # 1) Messages
+    _render_history(transcript, stage, input_key)
+
+    # 2) Input
+    user_prompt = st.chat_input("Message InspiraBot…", key=input_key)
+    if not user_prompt:
+        return
+    if "chat" not in ss:
+        lock_card("The assistant is not ready yet. Submit the *Key Pieces form* and try again.")
+        return
+
+    # Save & echo user turn
+    persistence.record_message(transcript, transcript.append("user", user_prompt, stage))
+    if on_user_message:
+        on_user_message(user_prompt)
+    with st.chat_message("user", avatar=_avatar("user")):
+        st.markdown(user_prompt)
+
+    # Stream assistant reply
+    _apply_primer(ss["chat"])
+    with st.chat_message("assistant", avatar=_avatar("assistant")):
+        placeholder = st.empty()
+        renderer = StreamRenderer(placeholder)
+        try:
+            for text in get_gateway().stream(ss["chat"], user_prompt, stage=stage):
+                renderer.feed(text)
+            full = renderer.finish()
+        except Exception as e:
+            friendly = resilience.friendly_message(e)  # timeouts / circuit open: a calm card, not a traceback
+            if friendly:
+                full = friendly
+                placeholder.warning(full)
+            else:
+                full = f"❌ Error from Gemini (streaming): {e}"
+                placeholder.error(full)
+    persistence.record_message(transcript, transcript.append("assistant", full, stage))
+
+
 def require_unlocked_for_outline() -> None:
     """Stop rendering Outline unless the Key Pieces form has been submitted."""
     if not st.session_state.get("form_valid", False):
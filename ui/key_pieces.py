@@ -1,38 +1,36 @@
 # === BEGIN FILE: ui/key_pieces.py ===
 import streamlit as st
-from ui.common import build_form_context, looks_gibberish
+from ui.common import chat_transcript, looks_gibberish
 
 def _ensure_defaults():
     ss = st.session_state
     ss.setdefault("form_valid", False)
     ss.setdefault("form_data", {})
     ss.setdefault("editing_form", True)   # show form by default until submitted
-    ss.setdefault("chat_history", [])
-    ss.setdefault("assistant_avatar", "assets/Avatar.png")
-    ss.setdefault("model_name", "gemini-2.0-flash")
 
 def _submit_form(form_vals: dict):
     """Create/refresh the system prompt + chat session when the form is submitted."""
-    from google import generativeai as genai
+    from llm import primer, resources
+    from llm.gateway import get_gateway
+    from ui import persistence
 
     ss = st.session_state
     ss["form_data"] = form_vals
     ss["form_valid"] = True
     ss["editing_form"] = False
 
-    # Build the system instruction: rules + form context
-    rules = ss.get("rules_text", "")
-    form_ctx = build_form_context(ss["form_data"])
-    system_text = (rules or "").strip() + "\n\n" + form_ctx
+    # Build the system instruction: rules + form context (deduped/versioned per process)
+    prompt = resources.system_prompt(ss["form_data"])
+    ss["system_prompt"] = prompt
 
-    # (Re)create model + chat session and reset UI-visible history
-    model_name = ss.get("model_name", "gemini-2.0-flash")
-    model = genai.GenerativeModel(model_name, system_instruction=system_text)
-    chat = model.start_chat(history=[])
-    ss["model_name"] = model_name
-    ss["model"] = model
-    ss["chat"] = chat
-    ss["chat_history"] = []
+    # (Re)create chat session and reset UI-visible history (model comes from the chat route)
+    ss["chat"] = get_gateway().start_chat(prompt, topic=form_vals.get("concept", ""))
+    chat_transcript().clear()
+    persistence.record_clear()
+
+    # Concept primer (facts, misconceptions, vocabulary) is written in the background
+    # and joins the system instruction on the first Outline turn after it is ready
+    primer.prefetch(form_vals)
 
 
 def render():
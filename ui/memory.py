@@ -0,0 +1,259 @@
+# === BEGIN FILE: ui/memory.py ===
+# Per-session memory accounting and idle eviction.
+# Every rerun "touches" its session in a process-wide registry; the touch measures the
+# session's footprint (at most once per MEASURE_S) on the script thread, and a session
+# over the per-session budget drops older transcript messages there, which page back in
+# from the session store. A background sweeper only handles sessions idle for
+# SESSION_IDLE_S: under the entry lock it pickles their heavy objects (chat, transcript,
+# render cache) to SPILL_DIR. Anything that reads a heavy key (script, fragment or widget
+# callback) touches first, which waits for a spill in progress and brings the objects
+# back; the touch also makes the session active again, so it is not spilled mid-run.
+# The registry holds sessions weakly: once Streamlit drops a closed session, its state
+# is collected and the entry and any spill file go with it.
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+import types
+import weakref
+from collections import deque
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from llm import metrics, settings
+
+HEAVY_KEYS = ("chat", "chat_history", "chat_render_cache")
+SPILLED_KEY = "_spilled"
+ANCHOR_KEY = "_memory_anchor"
+SWEEP_S = 30
+MEASURE_S = 30  # a session's footprint is re-measured at most this often
+TRIM_KEEP = 40  # messages kept in memory when a session is over budget
+
+log = logging.getLogger("inspirabot.memory")
+
+_SKIP = (types.FunctionType, types.MethodType, types.BuiltinFunctionType, types.ModuleType, type)
+_ATOMS = (str, bytes, int, float, bool, type(None))
+
+
+def footprint(obj, shared=()) -> int:
+    """Approximate deep size in bytes (containers, __dict__ and __slots__ are followed).
+
+    Objects in `shared` (process-wide, e.g. the registered system prompt) are not counted.
+    """
+    seen, stack, total = {id(o) for o in shared}, [obj], 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SKIP):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o, 64)
+        if isinstance(o, _ATOMS):
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+        else:
+            if isinstance(getattr(o, "__dict__", None), dict):
+                stack.append(o.__dict__)
+            for cls in type(o).__mro__:
+                for name in getattr(cls, "__slots__", ()):
+                    if hasattr(o, name):
+                        stack.append(getattr(o, name))
+    return total
+
+
+class _Anchor:
+    """Kept in the session's own state and referenced weakly by the registry.
+
+    SessionState itself can't be weakly referenced; the anchor <-> state cycle is
+    collected with the session, which fires the registry's weakref callback.
+    """
+    __slots__ = ("state", "__weakref__")
+
+    def __init__(self, state):
+        self.state = state
+
+
+class _Entry:
+    __slots__ = ("anchor", "lock", "last_seen", "measured_at", "bytes", "over_budget", "spilled")
+
+    def __init__(self, anchor: weakref.ref):
+        self.anchor = anchor
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+        self.measured_at = 0.0
+        self.bytes = 0
+        self.over_budget = False
+        self.spilled = False
+
+
+_registry = {}  # session id -> _Entry
+_registry_lock = threading.Lock()
+_collected = deque()  # session ids whose state was garbage-collected (appended by weakref callbacks)
+_sweeper = None
+
+
+def _spill_dir() -> str:
+    return settings.get("SPILL_DIR", "data/spill")
+
+
+def _idle_s() -> float:
+    return settings.get_float("SESSION_IDLE_S", 600)
+
+
+def _budget_bytes() -> int:
+    return int(settings.get_float("SESSION_MEMORY_BUDGET_MB", 8) * 1024 * 1024)
+
+
+def touch(session: str) -> None:
+    """Mark the session active; rehydrate spilled objects, measure it and trim it if over budget.
+
+    Call at the top of every full rerun, every fragment rerun that uses the chat and
+    every widget callback that reads a heavy key (callbacks run before the script).
+    """
+    global _sweeper
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    ss = st.session_state
+    # ctx.session_state is a per-run wrapper; the SessionState behind it (private attribute,
+    # hence getattr) lives as long as the session. The sweeper only uses it to spill an idle
+    # session, holding entry.lock; without it the session is still measured and trimmed.
+    state = getattr(ctx.session_state, "_state", None)
+    anchor = ss.get(ANCHOR_KEY)
+    if not isinstance(anchor, _Anchor) or anchor.state is not state:
+        anchor = ss[ANCHOR_KEY] = _Anchor(state)
+    with _registry_lock:
+        entry = _registry.get(session)
+        if entry is None or entry.anchor() is not anchor:
+            entry = _registry[session] = _Entry(weakref.ref(anchor, lambda _, s=session: _collected.append(s)))
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=_sweep_forever, name="session-memory-sweeper", daemon=True)
+            _sweeper.start()
+    with entry.lock:
+        now = entry.last_seen = time.monotonic()
+        path = ss.get(SPILLED_KEY)
+        if path:
+            _rehydrate(ss, path)
+        entry.spilled = False
+        if now - entry.measured_at < settings.get_float("SESSION_MEASURE_S", MEASURE_S):
+            return
+        entry.measured_at = now
+        entry.bytes = _measure(ss.to_dict())
+        entry.over_budget = entry.bytes > _budget_bytes()
+        if entry.over_budget:
+            _trim(ss)
+            entry.bytes = _measure(ss.to_dict())
+
+
+def _rehydrate(ss, path: str) -> None:
+    del ss[SPILLED_KEY]
+    try:
+        with open(path, "rb") as f:
+            heavy = pickle.load(f)
+        os.remove(path)
+    except (OSError, pickle.PickleError, EOFError) as e:
+        metrics.incr("memory.rehydrate_errors")
+        log.warning("could not rehydrate %s: %s", path, e)
+        return  # the app rebuilds a fresh chat; a saved session can still be resumed by token
+    for key, value in heavy.items():
+        if key not in ss:
+            ss[key] = value
+    metrics.incr("memory.rehydrated")
+
+
+def _trim(ss) -> None:
+    """Keep only recent messages in memory (older ones stay pageable via the session store)."""
+    ss.pop("chat_render_cache", None)
+    transcript = ss.get("chat_history")
+    if transcript is not None and getattr(transcript, "_loader", None) is not None:
+        dropped = transcript.truncate(TRIM_KEEP)
+        if dropped:
+            metrics.incr("memory.trimmed_messages", dropped)
+    metrics.incr("memory.trims")
+
+
+def _spill(session: str, state) -> None:
+    heavy = {key: state[key] for key in HEAVY_KEYS if key in state}
+    if not heavy:
+        return
+    os.makedirs(_spill_dir(), exist_ok=True)
+    path = os.path.join(_spill_dir(), f"{session}.pkl")
+    with open(path, "wb") as f:
+        pickle.dump(heavy, f, protocol=pickle.HIGHEST_PROTOCOL)
+    for key in heavy:
+        del state[key]
+    state[SPILLED_KEY] = path
+    metrics.incr("memory.spilled")
+
+
+def _measure(values: dict) -> int:
+    prompt = values.get("system_prompt")  # shared via llm.resources.registry
+    shared = [values.get("rules_text"), prompt, getattr(prompt, "text", None), values.get(ANCHOR_KEY)]
+    return footprint(values, shared=[o for o in shared if o is not None])
+
+
+def _forget_collected() -> None:
+    """Drop entries (and spill files) of sessions whose state has been garbage-collected."""
+    while _collected:
+        session = _collected.popleft()
+        with _registry_lock:
+            entry = _registry.get(session)
+            if entry is None or entry.anchor() is not None:  # replaced by a newer anchor meanwhile
+                continue
+            del _registry[session]
+        try:
+            os.remove(os.path.join(_spill_dir(), f"{session}.pkl"))
+        except OSError:
+            pass
+        metrics.incr("memory.collected")
+
+
+def sweep() -> None:
+    """One pass: forget collected sessions, spill sessions idle for SESSION_IDLE_S."""
+    _forget_collected()
+    idle_s = _idle_s()
+    with _registry_lock:
+        entries = list(_registry.items())
+    for session, entry in entries:
+        with entry.lock:
+            anchor = entry.anchor()
+            if anchor is None or anchor.state is None:
+                continue
+            if entry.spilled or time.monotonic() - entry.last_seen < idle_s:
+                continue
+            try:
+                _spill(session, anchor.state)
+                entry.spilled, entry.bytes = True, 0
+            except Exception as e:  # never let one session stop the sweeper
+                metrics.incr("memory.sweep_errors")
+                log.warning("spill failed for %s: %s", session, e)
+
+
+def _sweep_forever() -> None:
+    while True:
+        time.sleep(settings.get_float("SESSION_SWEEP_S", SWEEP_S))
+        sweep()
+
+
+def report() -> list:
+    """Bytes per live session (as of the last sweep), largest first."""
+    now = time.monotonic()
+    with _registry_lock:
+        entries = list(_registry.items())
+    rows = []
+    for session, entry in entries:
+        rows.append({
+            "session": session[:8],
+            "kb": round(entry.bytes / 1024, 1),
+            "idle_s": round(now - entry.last_seen),
+            "spilled": entry.spilled,
+            "over_budget": entry.over_budget,
+        })
+    return sorted(rows, key=lambda r: -r["kb"])
+# === END FILE: ui/memory.py ===
@@ -1,6 +1,11 @@
 # === BEGIN FILE: ui/outline.py ===
+import hashlib
+
 import streamlit as st
-from ui.common import require_unlocked_for_outline, looks_gibberish, lock_card
+from llm import metrics, resilience, resources, telemetry
+from llm.background import Speculator
+from llm.gateway import get_gateway
+from ui.common import require_unlocked_for_outline, looks_gibberish, lock_card, render_chat_area, chat_transcript, session_id
 
 # ---------- Visible student instructions (hard-coded) ----------
 KICKOFFS = {
@@ -52,6 +57,13 @@ CONS_PROMPT = {
 }
 
 
+# Seconds "Complete" waits for an in-flight background reframe before asking again itself
+CONSOLIDATE_WAIT_S = 30
+
+# Reframes computed while the student chats, memoized by (stage, text hash, prompt version, model)
+_reframes = Speculator()
+
+
 # ========== Local helpers (tab-specific) ==========
 def _ensure_outline_state():
     ss = st.session_state
@@ -59,94 +71,77 @@ def _ensure_outline_state():
     ss.setdefault("outline_started", {"characters": False, "scenario": False, "conflict": False})
     ss.setdefault("outline_done", {"characters": False, "scenario": False, "conflict": False})
     ss.setdefault("outline_summary", {"characters": "", "scenario": "", "conflict": ""})
-    ss.setdefault("outline_start_idx", {
-        "characters": len(ss.get("chat_history", [])),
-        "scenario": 0,
-        "conflict": 0
-    })
     ss.setdefault("outline_feedback", "")
 
 
-def _send_hidden_once(item: str):
-    """Send a one-time hidden kickoff message to the assistant (not shown in UI)."""
+def _queue_stage_directive(item: str):
+    """Attach the one-time hidden stage instruction to the student's next message.
+
+    No separate model call: the directive rides along with the first real turn of
+    the stage, so entering a stage costs zero round trips (see llm.directives.* and
+    outline.stage_transitions in llm.metrics).
+    """
     ss = st.session_state
     if ss["outline_started"][item]:
         return
-    try:
-        # We don't echo this into chat_history, so it's invisible to the student UI.
-        ss["chat"].send_message(
-            f"(Hidden instruction for assistant. Acknowledge internally only.)\n{KICKOFF_HIDDEN[item]}"
-        )
-    except Exception:
-        pass
+    if "chat" in ss:
+        get_gateway().set_directive(ss["chat"], KICKOFF_HIDDEN[item])
+    metrics.incr("outline.stage_transitions")
     ss["outline_started"][item] = True
-    ss["outline_start_idx"][item] = len(ss.get("chat_history", []))
 
 
 def _latest_user_since(item: str) -> str:
     """Most recent user message since this item started (for consolidation)."""
-    ss = st.session_state
-    start = ss["outline_start_idx"].get(item, 0)
-    latest = ""
-    for i, m in enumerate(ss.get("chat_history", [])):
-        if i >= start and m.get("role") == "user":
-            latest = m.get("parts", "")
-    return latest
+    return chat_transcript().latest_user(item)
 
 
-def _consolidate_to_lines(item: str, user_text: str) -> str:
-    """Ask the model for a 2–4 line reframe of the student's latest ideas (no new ideas)."""
-    from google import generativeai as genai
-    ss = st.session_state
-    model_name = ss.get("model_name", "gemini-2.0-flash")
-    # Light system context to stay aligned with rules, while keeping it a one-off call
-    rules = (ss.get("rules_text", "") or "") + "\n\nBe concise, accurate, and do not add new ideas."
-    model = genai.GenerativeModel(model_name, system_instruction=rules)
-    prompt = (
-        f"{CONS_PROMPT[item]}\n\n"
+def _reframe(item: str, user_text: str, prompt) -> str:
+    """Model call behind _consolidate_to_lines. Plain arguments only: also runs on worker threads."""
+    # Plain rules as system context (the process-wide cached prefix); the one-off
+    # instructions go in the request itself.
+    text = (
+        f"{CONS_PROMPT[item]} Be concise, accurate, and do not add new ideas.\n\n"
         f"Student's most recent ideas:\n\"\"\"\n{user_text}\n\"\"\"\n\n"
         "Return 2–4 short lines. No bullets."
     )
-    try:
-        return (model.generate_content(prompt).text or "").strip()
-    except Exception as e:
-        return f"_Could not generate summary: {e}_"
+    # Light model, small output cap, no search (llm.routing "consolidate")
+    return get_gateway().generate(text, prompt=prompt, purpose="consolidate").strip()
 
 
-def _render_messages_then_input(input_key: str):
-    """Replay message bubbles, then show chat input at the bottom (natural chat layout)."""
+def _reframe_args(item: str, user_text: str) -> tuple:
+    return item, user_text, resources.system_prompt()
+
+
+def _reframe_key(item, user_text, prompt) -> tuple:
+    digest = hashlib.sha256(user_text.encode("utf-8")).hexdigest()
+    return item, digest, prompt.version, get_gateway().router.route("consolidate").model
+
+
+def _prefetch_reframe(user_text: str):
+    """After each student message, start the stage reframe in the background (replacing any older job)."""
     ss = st.session_state
-    # 1) Messages
-    for msg in ss.get("chat_history", []):
-        avatar = "👩🏼‍💻" if msg["role"] == "user" else ss.get("assistant_avatar", "assets/Avatar.png")
-        with st.chat_message(msg["role"], avatar=avatar):
-            st.markdown(msg["parts"])
-
-    # 2) Input
-    user_prompt = st.chat_input("Message InspiraBot…", key=input_key)
-    if not user_prompt:
+    item = ss.get("outline_stage")
+    if item not in CONS_PROMPT or looks_gibberish(user_text):
         return
+    args = _reframe_args(item, user_text)
+    _reframes.prefetch((session_id(), item), _reframe_key(*args), _reframe, *args)
+
 
-    # Save & echo user turn
-    ss["chat_history"].append({"role": "user", "parts": user_prompt})
-    with st.chat_message("user", avatar="👩🏼‍💻"):
-        st.markdown(user_prompt)
-
-    # Stream assistant reply
-    with st.chat_message("assistant", avatar=ss.get("assistant_avatar", "assets/Avatar.png")):
-        placeholder = st.empty()
-        parts = []
-        try:
-            for chunk in ss["chat"].send_message_stream(user_prompt):
-                if getattr(chunk, "text", None):
-                    parts.append(chunk.text)
-                    placeholder.markdown("".join(parts) + "▌")
-            full = "".join(parts) if parts else ""
-            placeholder.markdown(full or "_No response text received._")
-        except Exception as e:
-            full = f"❌ Error from Gemini (streaming): {e}"
-            placeholder.error(full)
-    ss["chat_history"].append({"role": "assistant", "parts": full})
+def _consolidate_to_lines(item: str, user_text: str) -> str:
+    """2–4 line reframe of the student's latest ideas: prefetched result if ready, else ask now.
+
+    Raises if the model fails or returns nothing (an empty reframe is not a summary).
+    """
+    args = _reframe_args(item, user_text)
+    lines = _reframes.result(_reframe_key(*args), timeout=CONSOLIDATE_WAIT_S)
+    _reframes.release((session_id(), item))
+    if lines:
+        return lines
+    lines = _reframe(*args)
+    if not lines:
+        metrics.incr("outline.empty_reframes")
+        raise RuntimeError("the summary came back empty")
+    return lines
 
 
 def _complete_item(item: str, label: str):
@@ -156,8 +151,15 @@ def _complete_item(item: str, label: str):
         ss["outline_feedback"] = f"Please provide a clearer idea for **{label}** before completing."
         return
 
-    lines = _consolidate_to_lines(item, user_text)
+    try:
+        lines = _consolidate_to_lines(item, user_text)
+    except Exception as e:
+        reason = resilience.friendly_message(e) or f"Could not generate the summary ({e})."
+        ss["outline_feedback"] = f"{reason} **{label}** is not saved yet — press Complete again."
+        return
     ss["outline_summary"][item] = lines
+    if "chat" in ss:
+        get_gateway().set_summary(ss["chat"], item, lines)  # lets compaction replace the finished stage
     ss["outline_done"][item] = True
     ss["outline_feedback"] = f"Great — **{label}** saved. You can move on."
 
@@ -186,11 +188,16 @@ def _summary_block():
 
 def _render_stage(item: str, label: str, input_key: str):
     """Render the active stage only."""
-    _send_hidden_once(item)
+    with telemetry.tags(stage=item):
+        _render_stage_body(item, label, input_key)
+
+
+def _render_stage_body(item: str, label: str, input_key: str):
+    _queue_stage_directive(item)
     st.subheader(f"{'👤' if item=='characters' else '🗺️' if item=='scenario' else '⚡'} {label}")
     st.info(KICKOFFS[item])
 
-    _render_messages_then_input(input_key=input_key)
+    render_chat_area(input_key=input_key, stage=item, on_user_message=_prefetch_reframe)
 
     btn_label = f"✅ Complete {label}"
     if st.button(btn_label, use_container_width=True, key=f"btn_{item}"):
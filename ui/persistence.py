@@ -0,0 +1,153 @@
+# === BEGIN FILE: ui/persistence.py ===
+# Durable sessions: the student token lives in the URL (?s=<token>), so a reload, a
+# dropped websocket or a server restart resumes the same brief, outline and chat.
+# Writes go through core.session_store (batched write-behind); resuming rebuilds the
+# ChatSession from stored history without calling the model.
+import json
+import threading
+import uuid
+
+import streamlit as st
+from core.session_store import SessionStore
+from core.transcript import OUTLINE_STAGES, Transcript
+from llm import metrics, settings
+
+TOKEN_PARAM = "s"
+RESUME_TAIL = 40  # newest messages loaded on resume; older ones page in on demand
+
+# Stage/form state saved per student (everything else is derived or per-browser)
+STATE_KEYS = ("form_valid", "form_data", "editing_form",
+              "outline_stage", "outline_started", "outline_done", "outline_summary")
+
+_store = None
+_lock = threading.Lock()
+
+
+def store():
+    """Process-wide SessionStore, or None when SESSION_DB is set to an empty string."""
+    global _store
+    with _lock:
+        if _store is None:
+            path = settings.get("SESSION_DB", "data/sessions.sqlite3")
+            if not path:
+                return None
+            _store = SessionStore(path, flush_s=settings.get_float("SESSION_FLUSH_S", 1.0))
+        return _store
+
+
+class StoreLoader:
+    """Transcript loader paging older messages in from the store (picklable, unlike a lambda)."""
+
+    def __init__(self, token: str):
+        self.token = token
+
+    def __call__(self, before_seq: int, limit: int) -> list:
+        db = store()
+        return db.load_messages(self.token, before_seq=before_seq, limit=limit) if db is not None else []
+
+
+def attach_store(transcript: Transcript) -> None:
+    """Let a new transcript page dropped messages back in from the store."""
+    if store() is not None and "student_token" in st.session_state:
+        transcript.attach_loader(transcript.unloaded, StoreLoader(st.session_state["student_token"]))
+
+
+def student_token() -> str:
+    """Token from the URL, or a new one written back to the URL for later visits."""
+    ss = st.session_state
+    token = st.query_params.get(TOKEN_PARAM) or ss.get("student_token") or uuid.uuid4().hex
+    if st.query_params.get(TOKEN_PARAM) != token:
+        st.query_params[TOKEN_PARAM] = token
+    ss["student_token"] = token
+    return token
+
+
+def _history_from(transcript: Transcript, summaries: dict, done: dict) -> list:
+    """Model-side history: saved summaries for finished stages, raw turns for the rest."""
+    from llm.compaction import summary_turns  # same turns compaction makes, so it recognises them
+
+    history = []
+    for stage, summary in summaries.items():
+        if done.get(stage) and summary:
+            history += summary_turns(stage, summary)
+    for msg in transcript:
+        if not done.get(msg.stage):
+            history.append(("user" if msg.role == "user" else "model", msg.text, msg.stage))
+    return history
+
+
+def resume() -> bool:
+    """Load the student's saved session into this browser session (once); True if one was found."""
+    ss = st.session_state
+    db = store()
+    if db is None:
+        return False
+    token = student_token()
+    if ss.get("_resumed_token") == token:
+        return False
+    ss["_resumed_token"] = token
+    state = db.load_state(token)
+    if not state:
+        return False
+
+    from llm import primer, resources
+    from llm.gateway import get_gateway
+
+    for key in STATE_KEYS:
+        if key in state:
+            ss[key] = state[key]
+    ss["_saved_state"] = json.dumps(state, sort_keys=True)
+
+    total = db.message_count(token)
+    transcript = Transcript.from_export(db.load_messages(token, limit=RESUME_TAIL))
+    transcript.attach_loader(max(0, total - len(transcript)), StoreLoader(token))
+    stage = ss.get("outline_stage", "")
+    # An open Outline item's "Complete" needs its latest student message; other stages
+    # ("done", Synopsis, ...) never have one, so don't page the whole history in looking.
+    while stage in OUTLINE_STAGES and transcript.unloaded and not transcript.latest_user(stage):
+        transcript.load_earlier(RESUME_TAIL)
+    ss["chat_history"] = transcript
+
+    prompt = resources.system_prompt(ss.get("form_data") if ss.get("form_valid") else None)
+    ss["system_prompt"] = prompt
+    gateway = get_gateway()
+    summaries, done = ss.get("outline_summary") or {}, ss.get("outline_done") or {}
+    topic = (ss.get("form_data") or {}).get("concept", "") if ss.get("form_valid") else ""
+    chat = gateway.start_chat(prompt, history=_history_from(transcript, summaries, done), topic=topic)
+    for item, summary in summaries.items():
+        if done.get(item) and summary:
+            gateway.set_summary(chat, item, summary)
+    chat.stage = stage
+    ss["chat"] = chat
+    if ss.get("form_valid"):
+        primer.prefetch(ss.get("form_data") or {})
+    metrics.incr("sessions.resumed")
+    return True
+
+
+def record_message(transcript: Transcript, msg) -> None:
+    """Queue a just-appended transcript message for the store."""
+    db = store()
+    if db is not None and "student_token" in st.session_state:
+        db.append_message(st.session_state["student_token"], transcript.next_seq - 1, msg)
+
+
+def record_clear() -> None:
+    db = store()
+    if db is not None and "student_token" in st.session_state:
+        db.clear_messages(st.session_state["student_token"])
+
+
+def save_state() -> None:
+    """Queue the stage/form state if it changed since the last save (call once per rerun)."""
+    ss = st.session_state
+    db = store()
+    if db is None or "student_token" not in ss:
+        return
+    state = {key: ss[key] for key in STATE_KEYS if key in ss}
+    snapshot = json.dumps(state, sort_keys=True)
+    if snapshot != ss.get("_saved_state"):
+        ss["_saved_state"] = snapshot
+        db.save_state(ss["student_token"], state)
+        metrics.incr("sessions.state_saves")
+# === END FILE: ui/persistence.py ===
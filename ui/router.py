@@ -0,0 +1,38 @@
+# === BEGIN FILE: ui/router.py ===
+import importlib
+import streamlit as st
+from llm import telemetry
+
+# (label, module) pairs, left to right. Modules are imported the first time their tab opens.
+TABS = [
+    ("👋 Intro", "ui.intro"),
+    ("🌱 Key Pieces", "ui.key_pieces"),
+    ("💭 Outline", "ui.outline"),        # includes chat session (guided outline)
+    ("📝 Synopsis", "ui.synopsis"),      # includes chat session (synopsis + save/validate)
+    ("🧠 Brainstorm", "ui.brainstorm"),  # skeleton only in Phase 1a
+    ("✏️ Drafting", "ui.drafting"),      # skeleton only in Phase 1a
+]
+TAB_LABELS = [label for label, _ in TABS]
+ACTIVE_TAB_KEY = "active_tab"
+
+
+def _load(module_name: str):
+    """Import a tab module on first use (later calls hit sys.modules)."""
+    return importlib.import_module(module_name)
+
+
+def active_tab() -> str:
+    """Label of the tab the student is currently on."""
+    return st.session_state.get(ACTIVE_TAB_KEY) or TAB_LABELS[0]
+
+
+def render_tabs() -> None:
+    """Draw the tab bar and run only the selected tab's render()."""
+    tabs = st.tabs(TAB_LABELS, key=ACTIVE_TAB_KEY, on_change="rerun")
+    for tab, (label, module_name) in zip(tabs, TABS):
+        # .open is None only if state tracking is off; treat that as "render everything".
+        if tab.open is False:
+            continue
+        with tab, telemetry.tags(tab=label, session=st.session_state.get("session_id")):
+            _load(module_name).render()
+# === END FILE: ui/router.py ===
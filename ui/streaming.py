@@ -0,0 +1,72 @@
+# === BEGIN FILE: ui/streaming.py ===
+import time
+
+from llm import metrics, settings
+
+CURSOR = "▌"
+DEFAULT_FLUSH_MS = 50   # at most one frame per 50 ms
+DEFAULT_MIN_BYTES = 1   # and only when there is something new to show
+
+
+class StreamRenderer:
+    """Coalesce streamed text into throttled placeholder.markdown() frames.
+
+    Without this, every chunk re-sends the whole growing reply over the websocket
+    (quadratic in reply length). Frames go out at most every flush_ms and only
+    once min_bytes of new text are pending; finish() always sends the final text.
+    """
+
+    def __init__(self, placeholder, flush_ms: float = None, min_bytes: int = None):
+        self.placeholder = placeholder
+        self.flush_s = (flush_ms if flush_ms is not None else settings.get_float("STREAM_FLUSH_MS", DEFAULT_FLUSH_MS)) / 1000
+        self.min_bytes = min_bytes if min_bytes is not None else settings.get_int("STREAM_MIN_BYTES", DEFAULT_MIN_BYTES)
+        self._parts = []
+        self._pending = 0        # bytes received since the last frame
+        self._last_flush = 0.0
+        self.chunks = 0
+        self.frames = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, text: str) -> None:
+        if not text:
+            return
+        size = len(text.encode("utf-8"))
+        self._parts.append(text)
+        self.chunks += 1
+        self.bytes_received += size
+        self._pending += size
+        now = time.monotonic()
+        if self._pending >= self.min_bytes and now - self._last_flush >= self.flush_s:
+            self._frame(self.text + CURSOR, now)
+
+    def finish(self, empty_text: str = "_No response text received._") -> str:
+        """Send the final frame (no cursor) and record stats; returns the full text."""
+        full = self.text
+        self._frame(full or empty_text, time.monotonic())
+        metrics.incr("stream.replies")
+        metrics.incr("stream.chunks", self.chunks)
+        metrics.incr("stream.frames", self.frames)
+        metrics.incr("stream.bytes_received", self.bytes_received)
+        metrics.incr("stream.bytes_sent", self.bytes_sent)
+        return full
+
+    def stats(self) -> dict:
+        return {
+            "chunks": self.chunks,
+            "frames": self.frames,
+            "bytes_received": self.bytes_received,
+            "bytes_sent": self.bytes_sent,
+        }
+
+    def _frame(self, body: str, now: float) -> None:
+        self.placeholder.markdown(body)
+        self.frames += 1
+        self.bytes_sent += len(body.encode("utf-8"))
+        self._pending = 0
+        self._last_flush = now
+# === END FILE: ui/streaming.py ===